@@ -14,22 +14,65 @@ Upgrades:
 1) Algorithmic approach for parsing the text.
 2) Slight Optimizations to the encrypt function and parsing function.
 2) Key file now contains 'Tagged' list for unknown characters.
+3) Rotation is tracked as an offset over a fixed alphabet, so each character costs O(1) instead of a list scan
+   and a full list copy.
+4) Optional NumPy backend (backend='numpy') that encrypts and decrypts the whole text in bulk.
+5) Encrypted output is a binary .bar container holding one fixed-width alphabet index per character instead of
+   a space separated bit string. Legacy bit string payloads can still be decrypted (legacy_format=True writes them).
+6) encrypt_stream() encrypts text chunk by chunk, so inputs larger than memory can be processed.
+7) Decryption walks the tokens forward, and decrypt_stream() yields plaintext while the container is still being read.
+8) Containers are authenticated with a single keyed BLAKE2b MAC over the packed tokens (integrity='mac'). The
+   per-token SHA-256 sums remain available as integrity='sum' and are still verified for older keys.
+9) workers=N encrypts, verifies and decrypts independent segments of the text in a process pool.
+10) Unknown characters are appended to a per-message extension of the alphabet (unknown_chars='extend'), so every
+    character of the text is encrypted as exactly one token. Marking them with tags is kept as unknown_chars='tag'.
+11) The key is a compact binary file (permutation as packed indices, tags as length prefixed UTF-8, integers as
+    fixed-width fields) that is read without ast.literal_eval. legacy_format still writes the text key.
+12) Nothing has to touch the disk: the key is kept in memory as .key_data and can be handed back through key_data.
+    key_file and output_file accept paths or file objects, and encrypt()/decrypt() work in memory unless given them.
+13) aencrypt()/adecrypt() and aencrypt_stream()/adecrypt_stream() run the work in an executor so that an asyncio event
+    loop is never blocked. The streams advance one chunk per request, which gives backpressure and cancellation.
+14) encrypt_many()/decrypt_many() process a batch of documents with one session per worker, without per-message
+    garbage collection, progress bars or file output, and report the throughput of the batch.
+15) The alphabet and its lookup tables are built once at import, and NumPy, tqdm, asyncio and the process pool are
+    only imported when they are used, so short-lived processes start quickly.
+16) Every run records wall and CPU time per phase in a BARSStats object (BARS(...).stats), and progress can be
+    reported to a rate-limited callback instead of a tqdm bar (progress=callback).
+17) The container and the key are compressed by a selectable codec (compression='zlib', 'bz2', 'lzma' or 'none',
+    with compression_level) through incremental compressor objects. The codec is recorded in their headers, so
+    decryption picks it up by itself.
+18) encrypt_file()/decrypt_file() memory map the input and run it through the streaming functions, decoding UTF-8
+    chunk by chunk and writing through a buffered sink, so files of any size are processed in bounded memory.
+19) Bytes mode: bytes, bytearray or memoryview input is encrypted over a shuffled alphabet of the 256 byte values,
+    without parsing or tags, and decrypts back to bytes. It is mapped with bytes.translate tables instead of a
+    Python loop, so any file type (encrypt_file(binary=True)) is processed at byte-level speed.
+20) A message has at most one token per alphabet position, so a per-message codebook formats and hashes each
+    token once. 'sum' integrity is computed from the token counts and bit string tokens are decoded by a dict
+    lookup, instead of two SHA-256 hashes and a big integer division per character.
+21) Archives of every release are read by the same engine: the format is detected from the key (detect_version()),
+    Model 1.00/1.50 bit strings and Seq.key files are decrypted through the offset and codebook path, and migrate()
+    re-encrypts old archives into the current format in a process pool, verifying every round trip.
+22) BARSCipher(usr_key) derives the user key once and encrypts and decrypts any number of messages, from any number
+    of threads, with a fresh session per call and without forcing a garbage collection.
+23) Seekable containers (seekable=True) compress the tokens in independent chunks and end with an authenticated
+    index of them, so decrypt_range() reads and decrypts only the chunks a range of the plaintext falls in.
 
 Drawbacks:
 1) The file size grows:
-    Although the file size is shortened by the compression, it still shows a large growth in the encrypted file.
-    For example: A plain text file of size 39 KB have grown to 1085 KB after encryption. Tough it is better than the
-    previous model, on which a file of size 39 KB grows to 8.19 MB after encrypting.
+    Every character is still stored as a fixed-width token, and the compression only takes back part of it. For
+    example: 10.txt (1 MB of text) grows to about 1.4 MB in a .bar container, plus a key of about 1.2 KB. It is far
+    better than the first release of this model, on which a file of size 39 KB grew to 1085 KB, and the previous
+    model, on which it grew to 8.19 MB.
 
 2) Dictionary enlarges:
-    In this model, the static dictionary does not grow, but the tagged list does. This means the more unknown characters
-    are introduced, the tagged list will grow more, which may cause the encryption and decryption time to rise up
-    significantly.
+    The static dictionary does not grow, but the alphabet of a message gains one entry (and the key a few bytes) for
+    every distinct unknown character. With unknown_chars='tag' the tagged list grows instead, and the more unknown
+    characters are introduced, the more the encryption and decryption time rise.
 
 3) Text grows:
     Marking unknown character is still a robust way of encrypting text, but it does have side effects. The original text,
     after converting to marked text, grows which causes the algorithm to encrypt more characters than the original text.
-    This might cause the encryption and decryption time to rise up.
+    This might cause the encryption and decryption time to rise up. (Only with unknown_chars='tag'.)
 
 Comment: Future improvements are still required
 > Reduce encrypted file size more.
@@ -38,14 +81,94 @@ Comment: Future improvements are still required
 Code written and modified by : Arnab Pramanik
 """
 
+import codecs
 import gc
 import hashlib
+import hmac
 import random as rd
 import string as s
 import zlib
-import ast
+import contextlib
 import os
-from tqdm import tqdm
+import re
+import struct
+import sys
+import time
+from array import array
+from collections import Counter, deque
+from functools import partial
+from itertools import chain, islice, repeat
+
+np = None  # NumPy is only needed by the optional 'numpy' backend and is imported by _load_numpy()
+
+_LIMB_32 = (1 << 32) - 1
+_LIMB_64 = (1 << 64) - 1
+
+# .bar container: header | compressed stream of fixed-width little-endian alphabet indices | trailer
+_CONTAINER_MAGIC = b'BARS'
+_CONTAINER_END = b'SRAB'
+_CONTAINER_VERSION = 1
+_CONTAINER_HEADER = struct.Struct('<4sBBBBQ')  # magic, version, token width, flags, codec, token count
+_CONTAINER_TRAILER = struct.Struct('<QI4s')  # token count, CRC-32 of the packed tokens, end magic
+_UNKNOWN_COUNT = (1 << 64) - 1  # streamed containers only know their token count once the trailer is written
+_FLAG_STREAMED = 1
+_FLAG_INDEXED = 2  # seekable container: independently compressed chunks followed by their index
+_INDEX_CHUNK = 1 << 14  # tokens per chunk of a seekable container
+# index entry: end of the chunk in the container body, first token, first plaintext character, digest of the packed
+# tokens, MAC of the entry
+_INDEX_ENTRY = struct.Struct('<QQQ16s16s')
+_INDEX_SIGNED = _INDEX_ENTRY.size - 16  # leading bytes of an entry that its MAC covers
+_INDEX_FOOTER = struct.Struct('<QQ')  # chunk count, plaintext character count
+_INDEX_CONTEXT = struct.Struct('<QQBB')  # entry number, token count, token width, codec: bound into every entry MAC
+_WIDTH_FORMATS = {1: 'B', 2: 'H', 4: 'I'}
+
+# BARS.key: header | compressed stream of the alphabet as indices into the static list, the sorted extension code
+# points, the tags and the integrity fields
+_KEY_MAGIC = b'BKEY'
+_KEY_VERSION = 1
+# magic, version, flags, index width, codec, alphabet size, extension size, tag count, random key, token count
+_KEY_HEADER = struct.Struct('<4sBBBBIIIQQ')
+_KEY_TAG_LENGTH = struct.Struct('<H')
+_KEY_SUM_WIDTH = 16  # integrity sums are below 10 ** 12 * 2 ** 64
+_KEY_MAC_SIZE = 32
+_FLAG_MAC = 1
+_FLAG_BYTES = 2  # the alphabet is a permutation of the 256 byte values (bytes mode)
+_BYTE_SHIFTS = tuple(bytes(range(shift, 256)) + bytes(range(shift)) for shift in range(256))  # v -> (v + shift) % 256
+
+# Compression codecs and the id stored in the container and key headers. Earlier releases left that byte zero, which
+# is zlib.
+_CODECS = {'zlib': 0, 'none': 1, 'bz2': 2, 'lzma': 3}
+_CODEC_NAMES = {ident: name for name, ident in _CODECS.items()}
+_CODEC_LEVELS = {'zlib': range(0, 10), 'none': range(0), 'bz2': range(1, 10), 'lzma': range(0, 10)}
+
+_FILLER_SYMBOLS = ("áçéôüɑəɪʃʊʋʰˈːαβγδεζηθικλμνξοπρςστυφχψωϊϋόύώϏϐϑϒϓϔϕϖϗϘϙϚϛϜϝϞϟϠϡϢϣϤϥϦϧϨϩϪϫϬϭϮϯϰϱϲϳϴϵ϶ϷϸϹϺϻϼϽ"
+                   "ϾϿ“”∀∃∄∈∉∋∌∍∎∏∐∑−∓∔∕∖∗∘∙√∛∜∝∞∟∠∡∢∣∤∥∦∧∨∩∪∫∬∭∮∯∰∱∲∳∴∵∶∷∸∹∺∻∼∽∾∿≀≁≂≃≄≅≆≇≈≉≊≋≌≍≎≏≐≑≒≓≔≕≖"
+                   "≗≘≙≚≛≜≝≞≟≠≡≢≣≤≥≦≧≨≩≪≫≬≭≮≯≰≱≲≳≴≵≶≷≸≹≺≻≼≽≾≿⊀⊁⊂⊃⊄⊅⊆⊇⊈⊉⊊⊋⊌⊍⊎⊏⊐⊑⊒⊓⊔⊕⊖⊗⊘⊙⊚⊛⊜⊝⊞⊟⊠⊡⊢⊣⊤⊥⊦⊧⊨⊩⊪⊫⊬⊭"
+                   "⊮⊯⊰⊱⊲⊳⊴⊵⊶⊷⊸⊹⊺⊻⊼⊽⊾⊿⋀⋁⋂⋃⋄⋅⋆⋇⋈⋉⋊⋋⋌⋍⋎⋏⋐⋑⋒⋓⋔⋕⋖⋗⋘⋙⋚⋛⋜⋝⋞⋟⋠⋡⋢⋣⋤⋥⋦⋧⋨⋩⋪⋫⋬⋭⋮⋯⋰⋱⋲⋳⋴⋵⋶⋷⋸⋹⋺⋻⋼⋽⋾⋿⌀"
+                   "⌁⌂⌃⌄⌅⌆⌇⌈⌉⌊⌋⌌⌍⌎⌏⌐⌑⌒⌓⌔⌕⌖⌗⌘⌙⌚⌛⌜⌝⌞⌟⌠⌡⌢⌣⌤⌥⌦⌧⌨〈〉⌫⌬⌭⌮⌯⌰⌱⌲⌳⌴⌵⌶⌷⌸⌹⌺⌻⌼⌽⌾⌿⍀⍁⍂⍃⍄⍅⍆⍇⍈⍉⍊⍋⍌⍍⍎⍏⍐⍑⍒⍓⍔⍕⍖⍗"
+                   "⍘⍙⍚⍛⍜⍝⍞⍟⍠⍡⍢⍣⍤⍥⍦⍧⍨⍩⍪⍫⍬⍭⍮⍯⍰⍱⍲⍳⍴⍵⍶⍷⍸⍹⍺⍻⍼⍽⍾⍿⎀⎁⎂⎃⎄⎅⎆⎇⎈⎉⎊⎋⎌⎍⎎⎏⎐⎑⎒⎓⎔⎕⎖⎗⎘⎙⎚⎛⎜⎝⎞⎟⎠⎡⎢⎣⎤⎥⎦⎧⎨⎩⎪"
+                   "⎫⎬⎭⎮⎯⎰⎱⎲⎳⎴⎵⎶⎷⎸⎹⎺⎻⎼⎽⎾⎿⏀⏁⏂⏃⏄⏅⏆⏇⏈⏉⏊⏋⏌⏍⏎⏏⏐⏑⏒⏓⏔⏕⏖⏗⏘⏙⏚⏛⏜⏝⏞⏟⏠⏡⏢⏣⏤⏥⏦⏧⏨⏩⏪⏫⏬⏭⏮⏯⏰⏱⏲⏳⏴⏵⏶⏷⏸⏹⏺"
+                   "⏻⏼⏽⏾⏿␀␁␂␃␄␅␆␇␈␉␊␋␌␍␎␏␐␑␒␓␔␕␖␗␘␙␚␛␜␝␞␟␠␡␢␣␤☀♡")
+_STATIC_CHARS = tuple(
+    s.ascii_uppercase + s.punctuation + _FILLER_SYMBOLS + s.digits + s.ascii_lowercase + '\n' + s.whitespace)
+_STATIC_SET = frozenset(_STATIC_CHARS)
+_STATIC_POSITIONS = {}  # first position of each character, as list.index would find it
+_STATIC_SLOTS = {}  # every position of each character ('\n' appears twice)
+for _pos, _char in enumerate(_STATIC_CHARS):
+    _STATIC_POSITIONS.setdefault(_char, _pos)
+    _STATIC_SLOTS[_char] = _STATIC_SLOTS.get(_char, ()) + (_pos,)
+del _pos, _char
+_STATIC_REPEATED = tuple(char for char, positions in _STATIC_SLOTS.items() if len(positions) > 1)
+
+_TAG_PATTERN = re.compile('⌈~-?[0-9]+~⌉')  # marked form of a character outside the alphabet
+_V1_TAG_OFFSET = 9879  # Model 1.50 tags hold ord(char) - 9879 instead of ord(char) - 9849
+_V1_KEY_FILE = 'Seq.key'  # key file name of Model 1.00/1.50
+
+_MIN_SEGMENT = 1 << 16  # smallest run of text worth shipping to a worker process
+_PROGRESS_INTERVAL = 0.5  # shortest time in seconds between two calls of a progress callback
+_PROGRESS_BLOCK = 4096  # items processed between two looks at the clock
+_FILE_BUFFER = 1 << 20  # write buffer of encrypt_file()/decrypt_file()
+_STRIDE_BLOCK = 1 << 18  # bytes mode works through cache-sized blocks; a multiple of 256
 
 
 # =============================== Custom Error Types ==========================================
@@ -79,13 +202,426 @@ class ArgumentError(Exception):
 # =============================== Custom Error Types ==========================================
 
 
+def _load_numpy():
+    global np
+    if np is None:
+        import numpy
+        np = numpy
+    return np
+
+
+def _progress(iterable, desc, progress):
+    # progress is False, True for a tqdm bar (tqdm is only imported when a bar is actually shown) or a callback.
+    if not progress:
+        return iterable
+    if progress is True:
+        from tqdm import tqdm
+        return tqdm(iterable, desc=desc)
+    return _rate_limited(iterable, desc, progress)
+
+
+def _rate_limited(items, desc, callback):
+    # Calls callback(desc, done, total) at most every _PROGRESS_INTERVAL seconds, and once when the items run out.
+    total = len(items)
+    done = 0
+    deadline = time.monotonic() + _PROGRESS_INTERVAL
+    iterator = iter(items)
+    for block in iter(lambda: list(islice(iterator, _PROGRESS_BLOCK)), []):
+        yield from block
+        done += len(block)
+        if done == total or time.monotonic() >= deadline:
+            callback(desc, done, total)
+            deadline = time.monotonic() + _PROGRESS_INTERVAL
+
+
+class _CodecError(ValueError):
+    pass
+
+
+class _PlainCompressor:
+    # Compressor object of the 'none' codec.
+
+    @staticmethod
+    def compress(data):
+        return bytes(data)
+
+    @staticmethod
+    def flush():
+        return b''
+
+
+def _compressor(codec, level=None):
+    # bz2 and lzma are only imported when they are selected.
+    if codec == 'zlib':
+        return zlib.compressobj(-1 if level is None else level)
+    if codec == 'bz2':
+        import bz2
+        return bz2.BZ2Compressor(9 if level is None else level)
+    if codec == 'lzma':
+        import lzma
+        return lzma.LZMACompressor(preset=level)
+    return _PlainCompressor()
+
+
+class _Decompressor:
+    """
+    Incremental decompressor with the same interface for every codec. decompress(data, max_length) returns at most
+    max_length bytes and keeps the input it has not used yet; needs_input is False while more output can be had
+    without new input. eof and unused_data are those of zlib. The 'none' codec needs the length of the stream to
+    find its end. Corrupt data raises _CodecError.
+    """
+
+    def __init__(self, codec, length=None):
+        self.codec = codec
+        self.eof = codec == 'none' and length == 0
+        self.unused_data = b''
+        self.needs_input = True
+        self._tail = b''
+        self._remaining = length
+        if codec == 'zlib':
+            self._engine, self._errors = zlib.decompressobj(), zlib.error
+        elif codec == 'bz2':
+            import bz2
+            self._engine, self._errors = bz2.BZ2Decompressor(), (OSError, EOFError)
+        elif codec == 'lzma':
+            import lzma
+            self._engine, self._errors = lzma.LZMADecompressor(), (lzma.LZMAError, EOFError)
+        else:
+            self._engine, self._errors = None, ()
+
+    def decompress(self, data, max_length=-1):
+        try:
+            if self.codec == 'zlib':
+                inflated = self._engine.decompress(self._tail + data if self._tail else data, max(max_length, 0))
+                self._tail = self._engine.unconsumed_tail
+                self.needs_input = not self._tail and (max_length <= 0 or len(inflated) < max_length)
+            elif self._engine is not None:
+                inflated = self._engine.decompress(data, max_length)
+                self.needs_input = self._engine.needs_input
+            else:
+                return self._copy(data, max_length)
+        except self._errors as e:
+            raise _CodecError(f'{self.codec} stream is corrupted: {e}') from None
+        self.eof = self._engine.eof
+        self.unused_data = self._engine.unused_data
+        return inflated
+
+    def _copy(self, data, max_length):
+        buffered = self._tail + data if self._tail else bytes(data)
+        take = len(buffered) if self._remaining is None else min(len(buffered), self._remaining)
+        if max_length > 0:
+            take = min(take, max_length)
+        inflated, self._tail = buffered[:take], buffered[take:]
+        if self._remaining is not None:
+            self._remaining -= take
+            if self._remaining == 0:
+                self.eof, self.unused_data, self._tail = True, self._tail, b''
+        self.needs_input = not self._tail
+        return inflated
+
+
+def _inflate(codec, data):
+    # Decompresses a complete stream; anything truncated or followed by extra data raises _CodecError.
+    if codec == 'none':
+        return bytes(data)
+    decompressor = _Decompressor(codec)
+    inflated = decompressor.decompress(data)
+    if not decompressor.eof or decompressor.unused_data:
+        raise _CodecError(f'{codec} stream is truncated or followed by extra data')
+    return inflated
+
+
+class BARSStats:
+    """
+    Wall and CPU time per phase of a BARS run, in seconds: phases maps each phase that ran (parse, key_derivation,
+    token_loop, integrity, compression, key, file_io, gc) to {'wall': ..., 'cpu': ...}. CPU time is that of the
+    calling process, so work done by worker processes only shows up as wall time. With the python backend and
+    'sum' integrity the sums are computed inside token_loop.
+    """
+
+    def __init__(self):
+        self.phases = {}
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            entry = self.phases.setdefault(name, {'wall': 0.0, 'cpu': 0.0})
+            entry['wall'] += time.perf_counter() - wall
+            entry['cpu'] += time.process_time() - cpu
+
+    def merge(self, other):
+        for name, entry in other.phases.items():
+            total = self.phases.setdefault(name, {'wall': 0.0, 'cpu': 0.0})
+            total['wall'] += entry['wall']
+            total['cpu'] += entry['cpu']
+        return self
+
+    @property
+    def wall(self):
+        return sum(entry['wall'] for entry in self.phases.values())
+
+    @property
+    def cpu(self):
+        return sum(entry['cpu'] for entry in self.phases.values())
+
+    def as_dict(self):
+        return {name: dict(entry) for name, entry in self.phases.items()}
+
+    def __repr__(self):
+        phases = ', '.join(f"{name}={entry['wall']:.6f}s" for name, entry in self.phases.items())
+        return f'BARSStats({phases})'
+
+
+class _RotationEngine:
+    """
+    Shuffled alphabet that is rotated by moving an integer offset instead of rebuilding the list.
+    Rotating right once moves every character one place to the right, exactly like BARS._rotate(chr_lst, 1), so
+    the character at list position p sits at (p + offset) % size. Lookups in both directions are O(1) and the
+    rotation itself does not allocate.
+    """
+
+    def __init__(self, chr_lst, offset=0):
+        self.chars = tuple(chr_lst)
+        self.size = len(self.chars)
+        self.offset = offset % self.size
+        self.positions = {}
+        self.duplicates = {}
+        for pos, char in enumerate(self.chars):
+            if char in self.positions:
+                self.duplicates.setdefault(char, [self.positions[char]]).append(pos)
+            else:
+                self.positions[char] = pos
+
+    def index(self, char):
+        # list.index returns the first match, so a repeated character (e.g. '\n') resolves to whichever
+        # of its copies currently sits closest to the front of the rotated list.
+        if char in self.duplicates:
+            return min((pos + self.offset) % self.size for pos in self.duplicates[char])
+        try:
+            return (self.positions[char] + self.offset) % self.size
+        except KeyError:
+            raise ValueError(f'{char!r} is not in the alphabet') from None
+
+    def __getitem__(self, idx):
+        if not -self.size <= idx < self.size:
+            raise IndexError('alphabet index out of range')
+        return self.chars[(idx - self.offset) % self.size]
+
+    def __len__(self):
+        return self.size
+
+    def rotate(self, direction, times=1):
+        if direction == 1:  # rotate right
+            self.offset = (self.offset + times) % self.size
+        elif direction == -1:  # rotate left
+            self.offset = (self.offset - times) % self.size
+        else:
+            raise BARSDirectionError("Direction must be defined")
+
+    def to_list(self):
+        split = self.size - self.offset
+        return list(self.chars[split:] + self.chars[:split])
+
+
+class _Codebook:
+    """
+    Tokens of one message. Token idx is idx * rd_key + seed, so a message has at most one distinct token per
+    alphabet position: each one is formatted and hashed at most once, and integrity sums are taken from the
+    token counts.
+    """
+
+    def __init__(self, rd_key, seed):
+        self.rd_key = rd_key
+        self.seed = seed
+        self._binaries = {}
+        self._contributions = {}
+        self._indices = {}
+
+    def binary(self, idx):
+        binary = self._binaries.get(idx)
+        if binary is None:
+            binary = self._binaries[idx] = format(idx * self.rd_key + self.seed, 'b')
+        return binary
+
+    def contribution(self, idx):
+        # (surface, bottom) share of one token in the integrity sums
+        contribution = self._contributions.get(idx)
+        if contribution is None:
+            dic_idx = idx * self.rd_key + self.seed
+            contribution = self._contributions[idx] = (BARS._seed(format(dic_idx, 'b'), 12),
+                                                       BARS._seed(str(dic_idx), 8))
+        return contribution
+
+    def integrity(self, indices):
+        surface_level_integrity = 0
+        bottom_level_integrity = 0
+        for idx, count in Counter(indices).items():
+            surface, bottom = self.contribution(idx)
+            surface_level_integrity += surface * count
+            bottom_level_integrity += bottom * count
+        return surface_level_integrity, bottom_level_integrity
+
+    def tokens(self, indices):
+        # Bit string text of the legacy format, one space terminated token per index.
+        table = {idx: self.binary(idx) + ' ' for idx in set(indices)}
+        return ''.join(map(table.__getitem__, indices))
+
+    def indices(self, tokens, size):
+        # A token that no alphabet position produces raises IndexError, like an index outside the alphabet.
+        reverse = self._indices.get(size)
+        if reverse is None:
+            reverse = self._indices[size] = {self.binary(idx): idx for idx in range(size)}
+        try:
+            return list(map(reverse.__getitem__, tokens))
+        except KeyError:
+            raise IndexError('token cannot be decoded') from None
+
+
+class _ChunkIndex:
+    """
+    Cuts the packed tokens of a seekable container into chunks of about _INDEX_CHUNK tokens, compresses every chunk
+    on its own and keeps an index entry for it. A cut that would split a tag is moved to the tag's end, so every
+    chunk decrypts to whole characters and the entries can give the plaintext position of each chunk.
+    """
+
+    def __init__(self, codec, level, width):
+        self.codec = codec
+        self.level = level
+        self.width = width
+        self.entries = []
+        self.size = 0  # compressed bytes handed out
+        self.tokens = 0  # tokens handed out
+        self.chars = 0  # plaintext characters handed out
+        self._pending = bytearray()
+        self._spans = deque()  # token positions (start, end) of the tags not handed out yet
+
+    def add(self, payload, converted_text=None, tags=()):
+        """
+        Takes the next packed tokens and, for text with tags, the text they encrypt and the recorded tags. Returns
+        the chunks that are complete, compressed.
+        """
+        base = self.tokens + len(self._pending) // self.width
+        self._pending += payload
+        if tags:
+            self._spans.extend((base + match.start(), base + match.end())
+                               for match in _TAG_PATTERN.finditer(converted_text) if match.group() in tags)
+        blocks = []
+        while len(self._pending) // self.width >= _INDEX_CHUNK:
+            blocks.append(self._cut(_INDEX_CHUNK))
+        return blocks
+
+    def flush(self):
+        return self._cut(len(self._pending) // self.width) if self._pending else b''
+
+    def _cut(self, size):
+        # Tags that start before the cut go into this chunk whole, and only their first token starts a character.
+        end = self.tokens + size
+        inner = 0
+        while self._spans and self._spans[0][0] < end:
+            start, stop = self._spans.popleft()
+            end = max(end, stop)
+            inner += stop - start - 1
+        size = end - self.tokens
+        chunk = bytes(self._pending[:size * self.width])
+        del self._pending[:size * self.width]
+        compressor = _compressor(self.codec, self.level)
+        block = compressor.compress(chunk) + compressor.flush()
+        self.size += len(block)
+        self.entries.append((self.size, self.tokens, self.chars, hashlib.blake2b(chunk, digest_size=16).digest()))
+        self.tokens = end
+        self.chars += size - inner
+        return block
+
+    def index(self, index_key, count):
+        """
+        Returns the packed index: the entries, each with a MAC that binds it to its place in the container, then
+        the footer.
+        """
+        footer = _INDEX_FOOTER.pack(len(self.entries), self.chars)
+        table = []
+        for number, entry in enumerate(self.entries):
+            fields = _INDEX_ENTRY.pack(*entry, b'')[:_INDEX_SIGNED]
+            context = _INDEX_CONTEXT.pack(number, count, self.width, _CODECS[self.codec]) + footer
+            table.append(fields + hashlib.blake2b(context + fields, key=index_key, digest_size=16).digest())
+        return b''.join(table) + footer
+
+
 class BARS:
-    def __init__(self, usr_key, _contents, ecr: bool = True, output_file: bool = True):
-        self.key = usr_key
+    def __init__(self, usr_key, _contents, ecr: bool = True, output_file=True, backend: str = 'python',
+                 legacy_format: bool = False, integrity: str = None, workers: int = 1, unknown_chars: str = None,
+                 key_file='BARS.key', key_data: bytes = None, progress=True, compression: str = 'zlib',
+                 compression_level: int = None, seekable: bool = False):
+        self._configure(usr_key, output_file, backend, legacy_format, integrity, workers, unknown_chars, key_file,
+                        key_data, progress, compression, compression_level, seekable)
         self.text = _contents
-        self.output_file = output_file
         self.get = self._encrypt() if ecr else self._decrypt() if not ecr else self._raise_error()
 
+    @classmethod
+    def _session(cls, usr_key, output_file=True, backend='python', legacy_format=False, integrity=None, workers=1,
+                 unknown_chars=None, key_file='BARS.key', key_data=None, progress=False, compression='zlib',
+                 compression_level=None, seekable=False):
+        # Alternate constructor for the streaming APIs, which must not run a whole encryption in __init__.
+        self = cls.__new__(cls)
+        self._configure(usr_key, output_file, backend, legacy_format, integrity, workers, unknown_chars, key_file,
+                        key_data, progress, compression, compression_level, seekable)
+        self.text = None
+        return self
+
+    def _configure(self, usr_key, output_file, backend, legacy_format, integrity, workers, unknown_chars, key_file,
+                   key_data, progress, compression, compression_level, seekable):
+        if backend not in ('python', 'numpy'):
+            raise ArgumentError(f"Backend must be 'python' or 'numpy', but provided {backend!r}")
+        if backend == 'numpy':
+            try:
+                _load_numpy()
+            except ImportError:
+                raise BARSError("The 'numpy' backend requires NumPy, but it is not installed") from None
+        if integrity is None:
+            integrity = 'sum' if legacy_format else 'mac'
+        if integrity not in ('mac', 'sum'):
+            raise ArgumentError(f"Integrity must be 'mac' or 'sum', but provided {integrity!r}")
+        if integrity == 'mac' and legacy_format:
+            raise ArgumentError("Legacy bit string payloads can only carry 'sum' integrity")
+        if not isinstance(workers, int) or workers < 1:
+            raise ArgumentError(f'Workers must be a positive integer, but provided {workers!r}')
+        if unknown_chars is None:
+            unknown_chars = 'tag' if legacy_format else 'extend'
+        if unknown_chars not in ('tag', 'extend'):
+            raise ArgumentError(f"Unknown_chars must be 'tag' or 'extend', but provided {unknown_chars!r}")
+        if not isinstance(progress, bool) and not callable(progress):
+            raise ArgumentError(f'Progress must be True, False or a callable, but provided {progress!r}')
+        self.progress = progress
+        if compression not in _CODECS:
+            raise ArgumentError(f"Compression must be one of {', '.join(_CODECS)}, but provided {compression!r}")
+        if compression_level is not None and compression_level not in _CODEC_LEVELS[compression]:
+            raise ArgumentError(f'Compression level {compression_level!r} is not valid for {compression}')
+        if legacy_format and compression != 'zlib':
+            raise ArgumentError('Legacy_format output is always compressed with zlib')
+        self.compression = compression
+        self.compression_level = compression_level
+        if seekable and legacy_format:
+            raise ArgumentError('Legacy_format output is a bit string, which can not be made seekable')
+        self.seekable = seekable
+        self.stats = BARSStats()
+        self.unknown_chars = unknown_chars
+        self.integrity = integrity
+        self.workers = workers
+        self.key = usr_key
+        self.output_file = output_file
+        # key_file is a path, a binary file object or None. key_data holds the key in memory: it is filled in by
+        # encryption and, when given, used by decryption instead of key_file.
+        self.key_file = key_file
+        self.key_data = key_data
+        self._key_path = None
+        self._key_fallback = False  # the key was read from Seq.key because BARS.key is missing
+        self._spc_key = None
+        self._book = None
+        self.backend = backend
+        self.legacy_format = legacy_format
+
     def _raise_error(self):
         raise BARSError("ERC Argument Can Only Take TRUE Or FALSE")
 
@@ -117,14 +653,80 @@ class BARS:
             return chr_lst[1:] + chr_lst[:1]
         raise BARSDirectionError("Direction must be defined")
 
+    def _special_key(self):
+        # Derived from the user key once per session, so batches and streams hash it only once.
+        if self._spc_key is None:
+            self._spc_key = self._seed(u_key=self.key, val_len=10)
+        return self._spc_key
+
+    def _codebook(self, rd_key, seed):
+        # Kept for the message being processed, so the chunks of a stream share one codebook.
+        if self._book is None or (self._book.rd_key, self._book.seed) != (rd_key, seed):
+            self._book = _Codebook(rd_key, seed)
+        return self._book
+
+    def _mac(self, rd_key):
+        # Keyed BLAKE2b over the packed token stream, keyed by the user key and this message's random key.
+        mac_key = hashlib.blake2b(f'{self.key}:{rd_key}'.encode('utf-8'), digest_size=32, person=b'BARS-mac-key')
+        return hashlib.blake2b(key=mac_key.digest(), digest_size=32, person=b'BARS-mac')
+
+    def _index_key(self, rd_key):
+        # Keys the MACs of the index entries of a seekable container, whatever the integrity of the message.
+        return hashlib.blake2b(f'{self.key}:{rd_key}'.encode('utf-8'), digest_size=32, person=b'BARS-index').digest()
+
     @staticmethod
     def _generate():
         min_value = 10 ** (16 - 1)
         max_value = (10 ** 16) - 1
         rand_key = rd.randint(min_value, max_value)
-        string_val = str(rand_key)
-        ascii_string_val = "".join(chr(int(_)) for _ in string_val)
-        return rand_key, ascii_string_val
+        return rand_key
+
+    @staticmethod
+    def _write_output(target, data, default_name):
+        # target is True for the default file name in the working directory, a path or a file object.
+        if target is True:
+            target = default_name
+        if hasattr(target, 'write'):
+            target.write(data)
+        elif isinstance(data, bytes):
+            with open(target, 'wb') as dump_file:
+                dump_file.write(data)
+        else:
+            with open(target, 'w', encoding='utf-8') as dump_file:
+                dump_file.write(data)
+
+    def _store_key(self, key):
+        self.key_data = key
+        if self.key_file is not None:
+            self._write_output(self.key_file, key, 'BARS.key')
+
+    def _read_key(self, legacy=False):
+        # legacy: the ciphertext is a Model 1.00/1.50 bit string, whose key may still be in Seq.key.
+        if self.key_data is not None:
+            return self.key_data
+        if self.key_file is None:
+            raise ArgumentError('Decryption requires key_data or a key_file, but neither is provided')
+        if hasattr(self.key_file, 'read'):
+            return self.key_file.read()
+        path = self.key_file
+        if legacy and path == 'BARS.key' and not os.path.exists(path) and os.path.exists(_V1_KEY_FILE):
+            path = _V1_KEY_FILE
+        try:
+            with open(path, 'rb') as key_file:
+                key = key_file.read()
+        except FileNotFoundError:
+            raise FileNotFoundError(f'Decryption process requires a {self.key_file} file, but none is found.') from None
+        self._key_path = path
+        self._key_fallback = path != self.key_file
+        return key
+
+    def _discard_key(self, failed=False):
+        # Only a key that was read from a path is shredded; key_data and file objects belong to the caller. A Seq.key
+        # picked up in place of BARS.key may belong to another archive, so it is kept when decryption fails.
+        if self._key_path is not None:
+            if not (failed and self._key_fallback):
+                self._safe_delete(self._key_path)
+            self._key_path = None
 
     @staticmethod
     def _safe_delete(file_path):
@@ -144,202 +746,1469 @@ class BARS:
 
     @staticmethod
     def _static_list():
-        filler_symbols = ("áçéôüɑəɪʃʊʋʰˈːαβγδεζηθικλμνξοπρςστυφχψωϊϋόύώϏϐϑϒϓϔϕϖϗϘϙϚϛϜϝϞϟϠϡϢϣϤϥϦϧϨϩϪϫϬϭϮϯϰϱϲϳϴϵ϶ϷϸϹϺϻϼϽ"
-                          "ϾϿ“”∀∃∄∈∉∋∌∍∎∏∐∑−∓∔∕∖∗∘∙√∛∜∝∞∟∠∡∢∣∤∥∦∧∨∩∪∫∬∭∮∯∰∱∲∳∴∵∶∷∸∹∺∻∼∽∾∿≀≁≂≃≄≅≆≇≈≉≊≋≌≍≎≏≐≑≒≓≔≕≖"
-                          "≗≘≙≚≛≜≝≞≟≠≡≢≣≤≥≦≧≨≩≪≫≬≭≮≯≰≱≲≳≴≵≶≷≸≹≺≻≼≽≾≿⊀⊁⊂⊃⊄⊅⊆⊇⊈⊉⊊⊋⊌⊍⊎⊏⊐⊑⊒⊓⊔⊕⊖⊗⊘⊙⊚⊛⊜⊝⊞⊟⊠⊡⊢⊣⊤⊥⊦⊧⊨⊩⊪⊫⊬⊭"
-                          "⊮⊯⊰⊱⊲⊳⊴⊵⊶⊷⊸⊹⊺⊻⊼⊽⊾⊿⋀⋁⋂⋃⋄⋅⋆⋇⋈⋉⋊⋋⋌⋍⋎⋏⋐⋑⋒⋓⋔⋕⋖⋗⋘⋙⋚⋛⋜⋝⋞⋟⋠⋡⋢⋣⋤⋥⋦⋧⋨⋩⋪⋫⋬⋭⋮⋯⋰⋱⋲⋳⋴⋵⋶⋷⋸⋹⋺⋻⋼⋽⋾⋿⌀"
-                          "⌁⌂⌃⌄⌅⌆⌇⌈⌉⌊⌋⌌⌍⌎⌏⌐⌑⌒⌓⌔⌕⌖⌗⌘⌙⌚⌛⌜⌝⌞⌟⌠⌡⌢⌣⌤⌥⌦⌧⌨〈〉⌫⌬⌭⌮⌯⌰⌱⌲⌳⌴⌵⌶⌷⌸⌹⌺⌻⌼⌽⌾⌿⍀⍁⍂⍃⍄⍅⍆⍇⍈⍉⍊⍋⍌⍍⍎⍏⍐⍑⍒⍓⍔⍕⍖⍗"
-                          "⍘⍙⍚⍛⍜⍝⍞⍟⍠⍡⍢⍣⍤⍥⍦⍧⍨⍩⍪⍫⍬⍭⍮⍯⍰⍱⍲⍳⍴⍵⍶⍷⍸⍹⍺⍻⍼⍽⍾⍿⎀⎁⎂⎃⎄⎅⎆⎇⎈⎉⎊⎋⎌⎍⎎⎏⎐⎑⎒⎓⎔⎕⎖⎗⎘⎙⎚⎛⎜⎝⎞⎟⎠⎡⎢⎣⎤⎥⎦⎧⎨⎩⎪"
-                          "⎫⎬⎭⎮⎯⎰⎱⎲⎳⎴⎵⎶⎷⎸⎹⎺⎻⎼⎽⎾⎿⏀⏁⏂⏃⏄⏅⏆⏇⏈⏉⏊⏋⏌⏍⏎⏏⏐⏑⏒⏓⏔⏕⏖⏗⏘⏙⏚⏛⏜⏝⏞⏟⏠⏡⏢⏣⏤⏥⏦⏧⏨⏩⏪⏫⏬⏭⏮⏯⏰⏱⏲⏳⏴⏵⏶⏷⏸⏹⏺"
-                          "⏻⏼⏽⏾⏿␀␁␂␃␄␅␆␇␈␉␊␋␌␍␎␏␐␑␒␓␔␕␖␗␘␙␚␛␜␝␞␟␠␡␢␣␤☀♡")
-        lst = list(
-            s.ascii_uppercase + s.punctuation + filler_symbols + s.digits + s.ascii_lowercase + '\n' + s.whitespace)
-        return lst
+        return list(_STATIC_CHARS)
+
+    @staticmethod
+    def _tag_unknown(text, definitive_chars, tagged_lists):
+        # definitive_chars is a set, so finding the unknown characters is one pass over the distinct characters of
+        # the text, and all of them are replaced by their tags in a single translate pass.
+        unknown = set(text).difference(definitive_chars)
+        if not unknown:
+            return text
+        known_tags = set(tagged_lists)
+        table = {}
+        for char in unknown:
+            tag = f'⌈~{ord(char) - 9849}~⌉'
+            table[ord(char)] = tag
+            if tag not in known_tags:
+                tagged_lists.append(tag)
+        return text.translate(table)
 
     def _parse_text(self, text, revert=False, tagged_dict=None):
         converted_text = text
-        text = list(set(text))
         if not revert:
             tagged_lists = []
             definitive_chars = self._static_list()
-            rabbit = 0
-            hare = 1
-            if len(text) % 2 == 0:
-                text = list(text)
-                for _ in range(len(text) // 2):
-                    if text[rabbit] not in definitive_chars:
-                        converted_text = converted_text.replace(text[rabbit], f'⌈~{ord(text[rabbit]) - 9849}~⌉')
-                        tagged_lists.append(f'⌈~{ord(text[rabbit]) - 9849}~⌉')
-                    if text[hare] not in definitive_chars:
-                        converted_text = converted_text.replace(text[hare], f'⌈~{ord(text[hare]) - 9849}~⌉')
-                        tagged_lists.append(f'⌈~{ord(text[hare]) - 9849}~⌉')
-                    rabbit += 2
-                    hare += 2
-                del rabbit, hare, text
-                gc.collect()
-                for _ in range(3):
-                    rd.shuffle(definitive_chars)
-                # print(tagged_lists)
-                return list(converted_text), definitive_chars, tagged_lists
-
-            text = list(text)
-            for _ in range(len(text) // 2 + 1):
-                if text[rabbit] not in definitive_chars:
-                    converted_text = converted_text.replace(text[rabbit], f'⌈~{ord(text[rabbit]) - 9849}~⌉')
-                    tagged_lists.append(f'⌈~{ord(text[rabbit]) - 9849}~⌉')
-                if hare < len(text):
-                    if text[hare] not in definitive_chars:
-                        converted_text = converted_text.replace(text[hare], f'⌈~{ord(text[hare]) - 9849}~⌉')
-                        tagged_lists.append(f'⌈~{ord(text[hare]) - 9849}~⌉')
-                rabbit += 2
-                hare += 2
-            del rabbit, hare, text
-            gc.collect()
+            if self.unknown_chars == 'extend':
+                definitive_chars += sorted(set(text).difference(_STATIC_SET))
+            else:
+                converted_text = self._tag_unknown(text, _STATIC_SET, tagged_lists)
             for _ in range(3):
                 rd.shuffle(definitive_chars)
-            # print(tagged_lists)
-            return list(converted_text), definitive_chars, tagged_lists
+            return converted_text, definitive_chars, tagged_lists
 
         if revert and tagged_dict is not None:
-            for items in tagged_dict:
-                partial = items.replace('⌈~', '')
-                partial = partial.replace('~⌉', '')
-                extracted_character = chr(int(partial) + 9849)
-                converted_text = converted_text.replace(items, extracted_character)
-            return converted_text
+            if not tagged_dict:
+                return converted_text
+            # Only tags recorded in the key are expanded; anything else that looks like a tag is literal text.
+            # Model 1.50 keys are read as a ready {tag: character} dict, as their tags use another offset.
+            if isinstance(tagged_dict, dict):
+                extracted_characters = tagged_dict
+            else:
+                extracted_characters = {items: chr(int(items[2:-2]) + 9849) for items in tagged_dict}
+            return _TAG_PATTERN.sub(lambda match: extracted_characters.get(match.group(), match.group()),
+                                    converted_text)
         raise ArgumentError('Revert argument should be followed by "Tagged_dict" argument')
 
-    def _dump_key(self, *args):
-        tup_str = str(args)
-        static_list = self._static_list()
-        encoded = str("-".join(str(static_list.index(_)) for _ in tup_str))
-        compressed_key = self._compress(encoded)
-        with open('BARS.key', 'wb') as key_file:
-            key_file.write(compressed_key)
+    def _dump_key(self, shuffled_list, tagged_list, rd_key, integrity, count=None):
+        """
+        Builds the key and hands it to _store_key. integrity is the MAC digest or the (surface, bottom) sums. The
+        alphabet is stored as the position of each character in the static list followed by the extension
+        characters, in code point order.
+        """
+        if self.legacy_format:
+            self._dump_text_key(shuffled_list, tagged_list, rd_key, *integrity)
+            return
+        if isinstance(shuffled_list, bytes):
+            # Bytes mode: the alphabet is stored as the byte values themselves.
+            permutation, extension, width, flags = shuffled_list, array('I'), 1, _FLAG_BYTES
+        else:
+            extension = array('I', sorted(ord(char) for char in set(shuffled_list).difference(_STATIC_SET)))
+            positions = _STATIC_POSITIONS
+            if extension:
+                positions = dict(positions)
+                positions.update((chr(code), pos) for pos, code in enumerate(extension, len(_STATIC_CHARS)))
+            # A character the static list holds twice ('\n') takes each of its positions once.
+            slots = {char: list(_STATIC_SLOTS[char]) for char in _STATIC_REPEATED}
+            width = self._token_width(len(shuffled_list))
+            permutation = array(_WIDTH_FORMATS[width], (slots[char].pop() if char in slots else positions[char]
+                                                        for char in shuffled_list))
+            flags = 0
+            if sys.byteorder == 'big':
+                permutation.byteswap()
+                extension.byteswap()
+        tags = [items.encode('utf-8') for items in tagged_list]
+        if isinstance(integrity, bytes):
+            flags |= _FLAG_MAC
+            integrity_field = integrity
+        else:
+            integrity_field = b''.join(value.to_bytes(_KEY_SUM_WIDTH, 'little') for value in integrity)
+        header = _KEY_HEADER.pack(_KEY_MAGIC, _KEY_VERSION, flags, width, _CODECS[self.compression], len(permutation),
+                                  len(extension), len(tags), rd_key, _UNKNOWN_COUNT if count is None else count)
+        compressor = _compressor(self.compression, self.compression_level)
+        body = [header, compressor.compress(permutation), compressor.compress(extension)]
+        body.extend(compressor.compress(_KEY_TAG_LENGTH.pack(len(items)) + items) for items in tags)
+        body.extend((compressor.compress(integrity_field), compressor.flush()))
+        self._store_key(b''.join(body))
 
-    def _encrypt(self):
-        converted_text, shuffled_list, tagged_list = self._parse_text(text=self.text)
-        rd_key, ascii_val = self._generate()
-        spc_key = self._seed(u_key=self.key, val_len=10)
-        new_seed = self._seed(str(rd_key * spc_key), 16) * spc_key
+    def _dump_text_key(self, shuffled_list, tagged_list, rd_key, *integrity):
+        # Key format of the earlier releases, kept so that legacy_format output can still be read by them.
+        ascii_val = "".join(chr(int(_)) for _ in str(rd_key))
+        # Characters of an extended alphabet can not be spelled with the static list, so they are kept as code points.
+        shuffled_list = [char if char in _STATIC_SET else ord(char) for char in shuffled_list]
+        tup_str = str((shuffled_list, tagged_list, ascii_val, *integrity))
+        encoded = str("-".join(str(_STATIC_POSITIONS[_]) for _ in tup_str))
+        self._store_key(self._compress(encoded))
+
+    @staticmethod
+    def _token_width(size):
+        return 1 if size <= 1 << 8 else 2 if size <= 1 << 16 else 4
+
+    def _pack_container(self, payload, count, width, rd_key, converted_text=None, tags=()):
+        flags = _FLAG_INDEXED if self.seekable else 0
+        header = _CONTAINER_HEADER.pack(_CONTAINER_MAGIC, _CONTAINER_VERSION, width, flags,
+                                        _CODECS[self.compression], count)
+        trailer = _CONTAINER_TRAILER.pack(count, zlib.crc32(payload), _CONTAINER_END)
+        if self.seekable:
+            chunks = _ChunkIndex(self.compression, self.compression_level, width)
+            body = chunks.add(payload, converted_text, set(tags))
+            body.append(chunks.flush())
+            return b''.join((header, *body, chunks.index(self._index_key(rd_key), count), trailer))
+        compressor = _compressor(self.compression, self.compression_level)
+        return b''.join((header, compressor.compress(payload), compressor.flush(), trailer))
+
+    @staticmethod
+    def _unpack_container(container):
+        view = memoryview(container)
+        if len(view) < _CONTAINER_HEADER.size + _CONTAINER_TRAILER.size:
+            raise DecryptionError('Encrypted container is truncated')
+        magic, version, width, flags, codec, count = _CONTAINER_HEADER.unpack_from(view)
+        if version != _CONTAINER_VERSION:
+            raise DecryptionError(f'Unsupported container version {version}')
+        if width not in _WIDTH_FORMATS:
+            raise DecryptionError(f'Unsupported token width {width}')
+        if codec not in _CODEC_NAMES:
+            raise DecryptionError(f'Unsupported compression codec {codec}')
+        trailer_count, checksum, end = _CONTAINER_TRAILER.unpack_from(view, len(view) - _CONTAINER_TRAILER.size)
+        if end != _CONTAINER_END or count not in (trailer_count, _UNKNOWN_COUNT):
+            raise DecryptionError('Encrypted container is truncated or corrupted')
+        body_end = len(view) - _CONTAINER_TRAILER.size
+        try:
+            if flags & _FLAG_INDEXED:
+                index_start, chunk_count = BARS._index_bounds(view[body_end - _INDEX_FOOTER.size:body_end], body_end)
+                table = view[index_start:index_start + chunk_count * _INDEX_ENTRY.size]
+                ends = [entry[0] for entry in _INDEX_ENTRY.iter_unpack(table)]
+                if ends and ends[-1] != index_start - _CONTAINER_HEADER.size:
+                    raise _CodecError('chunks do not end where the index starts')
+                payload = b''.join(_inflate(_CODEC_NAMES[codec],
+                                            view[_CONTAINER_HEADER.size + start:_CONTAINER_HEADER.size + stop])
+                                   for start, stop in zip(chain((0,), ends), ends))
+            else:
+                payload = _inflate(_CODEC_NAMES[codec], view[_CONTAINER_HEADER.size:body_end])
+        except _CodecError:
+            raise DecryptionError('Encrypted container is truncated or corrupted') from None
+        if zlib.crc32(payload) != checksum or len(payload) != trailer_count * width:
+            raise IntegrityViolation("Data Or Key Has Been Compromised")
+        return payload, width
+
+    @staticmethod
+    def _index_bounds(footer, end):
+        # Locates the entries of a seekable container from its index footer, which ends where the trailer starts.
+        if end < _CONTAINER_HEADER.size + _INDEX_FOOTER.size:
+            raise _CodecError('index is missing')
+        chunk_count, _ = _INDEX_FOOTER.unpack(footer)
+        if chunk_count > (end - _CONTAINER_HEADER.size - _INDEX_FOOTER.size) // _INDEX_ENTRY.size:
+            raise _CodecError('index is truncated')
+        return end - _INDEX_FOOTER.size - chunk_count * _INDEX_ENTRY.size, chunk_count
+
+    @staticmethod
+    def _unpack_indices(payload, width):
+        if width == 1 or sys.byteorder == 'little':
+            return memoryview(payload).cast(_WIDTH_FORMATS[width])
+        indices = array(_WIDTH_FORMATS[width])
+        indices.frombytes(payload)
+        indices.byteswap()
+        return indices
+
+    def _encrypt_block(self, converted_text, alphabet, rd_key, new_seed, progress=True):
+        """
+        Encrypts parsed text starting from the alphabet's current rotation and leaves the alphabet rotated past it.
+        Returns the payload (packed indices, or the bit string text with legacy_format) and the integrity sums,
+        which are only computed for 'sum' integrity.
+        """
         bottom_level_integrity = 0
         surface_level_integrity = 0
-        encrypted = ''
-
-        h_index = 0
-        e_index = 1
-
-        if len(converted_text) % 2 == 0:
-            for _ in tqdm(range(len(converted_text) // 2), desc='Encrypting'):
-                dic_idx = ((shuffled_list.index(converted_text[h_index])) * rd_key) + new_seed
-                bottom_level_integrity += self._seed(str(dic_idx), 8)
-                binary = format(int(dic_idx), 'b')
-                surface_level_integrity += self._seed(str(binary), 12)
-                encrypted += binary + ' '
-                shuffled_list = self._rotate(shuffled_list, 1)
-
-                dic_idx = ((shuffled_list.index(converted_text[e_index])) * rd_key) + new_seed
-                bottom_level_integrity += self._seed(str(dic_idx), 8)
-                binary = format(int(dic_idx), 'b')
-                surface_level_integrity += self._seed(str(binary), 12)
-                encrypted += binary + ' '
-                shuffled_list = self._rotate(shuffled_list, 1)
-
-                h_index += 2
-                e_index += 2
+        width = self._token_width(alphabet.size)
+        if self.backend == 'numpy':
+            indices = self._alphabet_indices(converted_text, alphabet)
+            if self.integrity == 'sum':
+                binaries, surface_level_integrity, bottom_level_integrity = self._index_integrity_numpy(
+                    indices, rd_key, new_seed)
+            alphabet.rotate(1, len(converted_text))
+            if self.legacy_format:
+                return ''.join(binaries[indices].tolist()), surface_level_integrity, bottom_level_integrity
+            return indices.astype(f'<u{width}').tobytes(), surface_level_integrity, bottom_level_integrity
+
+        indices = array(_WIDTH_FORMATS[width])
+        for char in _progress(converted_text, 'Encrypting', progress):
+            indices.append(alphabet.index(char))
+            alphabet.rotate(1)
+        if self.integrity == 'sum':
+            codebook = self._codebook(rd_key, new_seed)
+            surface_level_integrity, bottom_level_integrity = codebook.integrity(indices)
+            if self.legacy_format:
+                return codebook.tokens(indices), surface_level_integrity, bottom_level_integrity
+        if sys.byteorder == 'big':
+            indices.byteswap()
+        return indices.tobytes(), surface_level_integrity, bottom_level_integrity
+
+    @staticmethod
+    def _byte_alphabet():
+        alphabet = bytearray(range(256))
+        for _ in range(3):
+            rd.shuffle(alphabet)
+        return alphabet
+
+    @staticmethod
+    def _translate_strided(data, tables):
+        # Byte k is mapped by tables[k % 256]: one bytes.translate per strided slice of a block instead of a step
+        # per byte. Blocks keep the strided passes in cache.
+        translated = bytearray(len(data))
+        view = memoryview(data)
+        for start in range(0, len(data), _STRIDE_BLOCK):
+            block = view[start:start + _STRIDE_BLOCK].tobytes()
+            end = start + len(block)
+            for residue in range(min(256, len(block))):
+                translated[start + residue:end:256] = block[residue::256].translate(tables[residue])
+        return translated
+
+    @staticmethod
+    def _byte_ramp_numpy(offset, size):
+        # ramp[k] = (offset + k) % 256, the rotation of byte k
+        return np.resize(np.roll(np.arange(256, dtype=np.uint8), -offset), size)
+
+    def _encrypt_raw(self, data, alphabet, rd_key, new_seed):
+        """
+        Bytes mode counterpart of _encrypt_block. The index of byte k depends only on its position in the alphabet
+        and on the rotation, which repeats every 256 bytes, so each residue of k mod 256 has one translation table.
+        The payload is the indices themselves (one byte each).
+        """
+        positions = bytearray(256)
+        for pos, value in enumerate(alphabet.chars):
+            positions[value] = pos
+        if self.backend == 'numpy':
+            ramp = self._byte_ramp_numpy(alphabet.offset, len(data))
+            payload = (np.frombuffer(positions, dtype=np.uint8)[np.frombuffer(data, dtype=np.uint8)] + ramp).tobytes()
         else:
-            for _ in tqdm(range(len(converted_text) // 2 + 1), desc='Encrypting'):
-                dic_idx = ((shuffled_list.index(converted_text[h_index])) * rd_key) + new_seed
-                bottom_level_integrity += self._seed(str(dic_idx), 8)
-                binary = format(int(dic_idx), 'b')
-                surface_level_integrity += self._seed(str(binary), 12)
-                encrypted += binary + ' '
-                shuffled_list = self._rotate(shuffled_list, 1)
-
-                if e_index < len(converted_text):
-                    dic_idx = ((shuffled_list.index(converted_text[e_index])) * rd_key) + new_seed
-                    bottom_level_integrity += self._seed(str(dic_idx), 8)
-                    binary = format(int(dic_idx), 'b')
-                    surface_level_integrity += self._seed(str(binary), 12)
-                    encrypted += binary + ' '
-                    shuffled_list = self._rotate(shuffled_list, 1)
-
-                h_index += 2
-                e_index += 2
-
-        del converted_text, rd_key, new_seed, h_index, e_index
-        gc.collect()
-
-        self._dump_key(shuffled_list, tagged_list, ascii_val, surface_level_integrity, bottom_level_integrity)
-
-        encrypted = self._compress(encrypted)
+            tables = [positions.translate(_BYTE_SHIFTS[(alphabet.offset + residue) % 256]) for residue in range(256)]
+            payload = self._translate_strided(data, tables)
+        alphabet.rotate(1, len(payload))
+        if self.integrity == 'sum':
+            return (payload, *self._index_integrity(payload, rd_key, new_seed))
+        return payload, 0, 0
+
+    def _decrypt_raw(self, payload, alphabet):
+        chars = bytes(alphabet.chars)
+        if self.backend == 'numpy':
+            ramp = self._byte_ramp_numpy(alphabet.offset, len(payload))
+            decrypted = np.frombuffer(chars, dtype=np.uint8)[np.frombuffer(payload, dtype=np.uint8) - ramp].tobytes()
+        else:
+            tables = [_BYTE_SHIFTS[(-alphabet.offset - residue) % 256].translate(chars) for residue in range(256)]
+            decrypted = bytes(self._translate_strided(payload, tables))
+        alphabet.rotate(1, len(payload))
+        return decrypted
+
+    def _encrypt_parallel(self, converted_text, alphabet, rd_key, new_seed):
+        """
+        Splits the text into segments whose starting rotation is known up front (the rotation at position i is just
+        i mod M) and encrypts them in worker processes. Payloads are joined in order and the integrity sums added,
+        so the result is identical to a single process _encrypt_block.
+        """
+        segment = max(_MIN_SEGMENT, -(-len(converted_text) // self.workers))
+        starts = range(0, len(converted_text), segment)
+        config = (self.backend, self.legacy_format, self.integrity)
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=min(self.workers, len(starts))) as executor:
+            results = list(executor.map(_encrypt_segment, repeat(config), repeat(alphabet.chars),
+                                        (alphabet.offset + start for start in starts),
+                                        (converted_text[start:start + segment] for start in starts),
+                                        repeat(rd_key), repeat(new_seed)))
+        alphabet.rotate(1, len(converted_text))
+        payloads = [payload for payload, _, _ in results]
+        encrypted = ''.join(payloads) if self.legacy_format else b''.join(payloads)
+        return encrypted, sum(surface for _, surface, _ in results), sum(bottom for _, _, bottom in results)
+
+    def _encrypt(self):
+        encrypted = self._encrypt_document(self.text, progress=self.progress)
+        with self.stats.phase('gc'):
+            gc.collect()
         if self.output_file:
-            with open('Encrypted.bar', 'wb') as dump_ecr_file:
-                dump_ecr_file.write(encrypted)
+            with self.stats.phase('file_io'):
+                self._write_output(self.output_file, encrypted, 'Encrypted.bar')
         return encrypted
 
-    def _load_key(self):
-        if 'BARS.key' not in os.listdir():
-            raise FileNotFoundError('Decryption process requires a BARS.key file, but none is found.')
-        static_list = self._static_list()
-        with open('BARS.key', 'rb') as key_file:
-            decompressed_key = self._decompress(key_file.read()).split('-')
-            definitive_key = ''.join(static_list[int(_)] for _ in decompressed_key)
-            shuffled_list, tagged_list, rd_key, integrity_s, integrity_b = ast.literal_eval(definitive_key)
-            rd_key = int("".join(str(ord(_)) for _ in rd_key))
-            return rd_key, shuffled_list, tagged_list, integrity_s, integrity_b
+    def _encrypt_document(self, text, progress=False):
+        # Encrypts one text and stores its key; clean-up and file output are left to the caller.
+        stats = self.stats
+        raw = isinstance(text, (bytes, bytearray, memoryview))
+        if raw and self.legacy_format:
+            raise ArgumentError('Bytes input can not be written in legacy_format')
+        with stats.phase('parse'):
+            if raw:
+                converted_text = text.cast('B') if isinstance(text, memoryview) else text
+                shuffled_list, tagged_list = self._byte_alphabet(), []
+            else:
+                converted_text, shuffled_list, tagged_list = self._parse_text(text=text)
+        with stats.phase('key_derivation'):
+            rd_key = self._generate()
+            spc_key = self._special_key()
+            new_seed = self._seed(str(rd_key * spc_key), 16) * spc_key
+
+        alphabet = _RotationEngine(shuffled_list)
+        width = self._token_width(alphabet.size)
+        with stats.phase('token_loop'):
+            if raw:
+                encrypted, surface_level_integrity, bottom_level_integrity = self._encrypt_raw(
+                    converted_text, alphabet, rd_key, new_seed)
+            elif self.workers > 1 and len(converted_text) > _MIN_SEGMENT:
+                encrypted, surface_level_integrity, bottom_level_integrity = self._encrypt_parallel(
+                    converted_text, alphabet, rd_key, new_seed)
+            else:
+                encrypted, surface_level_integrity, bottom_level_integrity = self._encrypt_block(
+                    converted_text, alphabet, rd_key, new_seed, progress)
+        shuffled_list = bytes(alphabet.to_list()) if raw else alphabet.to_list()
+        with stats.phase('integrity'):
+            if self.integrity == 'mac':
+                mac = self._mac(rd_key)
+                mac.update(encrypted)
+                integrity = mac.digest()
+            else:
+                integrity = (surface_level_integrity, bottom_level_integrity)
+
+        count = None if self.legacy_format else len(encrypted) // width
+        with stats.phase('key'):
+            self._dump_key(shuffled_list, tagged_list, rd_key, integrity, count)
+        with stats.phase('compression'):
+            if self.legacy_format:
+                return self._compress(encrypted)
+            return self._pack_container(encrypted, count, width, rd_key, converted_text, tagged_list)
+
+    def _encrypt_stream(self, chunks):
+        # The first chunk decides between text and bytes mode.
+        stats = self.stats
+        chunks = iter(chunks)
+        first = next(chunks, '')
+        chunks = chain((first,), chunks)
+        raw = isinstance(first, (bytes, bytearray, memoryview))
+        if raw:
+            definitive_chars = self._byte_alphabet()
+        else:
+            definitive_chars = self._static_list()
+            for _ in range(3):
+                rd.shuffle(definitive_chars)
+        with stats.phase('key_derivation'):
+            rd_key = self._generate()
+            spc_key = self._special_key()
+            new_seed = self._seed(str(rd_key * spc_key), 16) * spc_key
+        tagged_list = []
+        bottom_level_integrity = 0
+        surface_level_integrity = 0
+        checksum = 0
+        count = 0
+
+        alphabet = _RotationEngine(definitive_chars)
+        width = self._token_width(alphabet.size)
+        mac = self._mac(rd_key) if self.integrity == 'mac' else None
+        if self.seekable:
+            index = _ChunkIndex(self.compression, self.compression_level, width)
+        else:
+            compressor = _compressor(self.compression, self.compression_level)
+        yield _CONTAINER_HEADER.pack(_CONTAINER_MAGIC, _CONTAINER_VERSION, width,
+                                     (_FLAG_STREAMED | _FLAG_INDEXED) if self.seekable else _FLAG_STREAMED,
+                                     _CODECS[self.compression], _UNKNOWN_COUNT)
+        for chunk in chunks:
+            with stats.phase('parse'):
+                if raw:
+                    converted_text = chunk.cast('B') if isinstance(chunk, memoryview) else chunk
+                else:
+                    converted_text = self._tag_unknown(chunk, _STATIC_SET, tagged_list)
+            with stats.phase('token_loop'):
+                if raw:
+                    payload, surface, bottom = self._encrypt_raw(converted_text, alphabet, rd_key, new_seed)
+                else:
+                    payload, surface, bottom = self._encrypt_block(converted_text, alphabet, rd_key, new_seed,
+                                                                   progress=False)
+            surface_level_integrity += surface
+            bottom_level_integrity += bottom
+            with stats.phase('integrity'):
+                if mac is not None:
+                    mac.update(payload)
+                checksum = zlib.crc32(payload, checksum)
+            count += len(converted_text)
+            with stats.phase('compression'):
+                if self.seekable:
+                    block = b''.join(index.add(payload, None if raw else converted_text, set(tagged_list)))
+                else:
+                    block = compressor.compress(payload)
+            if block:
+                yield block
+
+        # The key is written before the last block so that a consumer that stops at the trailer still has it.
+        shuffled_list = bytes(alphabet.to_list()) if raw else alphabet.to_list()
+        with stats.phase('key'):
+            if mac is not None:
+                self._dump_key(shuffled_list, tagged_list, rd_key, mac.digest(), count)
+            else:
+                self._dump_key(shuffled_list, tagged_list, rd_key, (surface_level_integrity, bottom_level_integrity),
+                               count)
+        with stats.phase('compression'):
+            if self.seekable:
+                block = index.flush() + index.index(self._index_key(rd_key), count)
+            else:
+                block = compressor.flush()
+        yield block + _CONTAINER_TRAILER.pack(count, checksum, _CONTAINER_END)
+
+    def _load_key(self, legacy=False):
+        key = self._read_key(legacy)
+        if key[:len(_KEY_MAGIC)] == _KEY_MAGIC:
+            return self._parse_key(key)
+        version, fields = self._parse_text_key(key)
+        if version != '2.0':
+            ascii_key, dictionary, bottom_level_integrity, surface_level_integrity = fields
+            rd_key = int("".join(str(ord(_)) for _ in ascii_key))
+            # Model 1.50 appended the tag of every unknown character to the alphabet itself. Tags are encrypted
+            # character by character, and a token pointing at such an entry was reverted to the tag's character,
+            # so the entry is replaced by that character and the alphabet stays one character per position.
+            tagged_dict = {items: chr(int(items[2:-2]) + _V1_TAG_OFFSET) for items in dictionary if len(items) > 1}
+            shuffled_list = [tagged_dict.get(items, items) for items in dictionary]
+            return rd_key, shuffled_list, tagged_dict, (surface_level_integrity, bottom_level_integrity), None
+        shuffled_list, tagged_list, rd_key, *integrity = fields
+        shuffled_list = [chr(char) if isinstance(char, int) else char for char in shuffled_list]
+        rd_key = int("".join(str(ord(_)) for _ in rd_key))
+        # MAC keys hold (tag, count); sum keys hold (surface, bottom) and, unless legacy_format, the count.
+        if isinstance(integrity[0], str):
+            return rd_key, shuffled_list, tagged_list, bytes.fromhex(integrity[0]), integrity[1]
+        count = integrity[2] if len(integrity) > 2 else None
+        return rd_key, shuffled_list, tagged_list, tuple(integrity[:2]), count
+
+    @classmethod
+    def _parse_text_key(cls, key):
+        """
+        Reads a text key and returns its release and fields. Model 1.00/1.50 join the static positions of the key
+        characters with spaces, Model 2.00 (and legacy_format) with dashes. A Model 1.50 key without tags is the same
+        as a Model 1.00 key.
+        """
+        import ast  # only text keys of earlier releases need it
+        try:
+            decompressed_key = cls._decompress(key)
+            separator = ' ' if ' ' in decompressed_key else '-'
+            fields = ast.literal_eval(''.join(_STATIC_CHARS[int(_)] for _ in decompressed_key.split(separator)))
+        except (zlib.error, UnicodeDecodeError, ValueError, IndexError, SyntaxError):
+            raise DecryptionError('Key file is truncated or corrupted') from None
+        if separator == '-':
+            return '2.0', fields
+        return ('1.5' if any(len(items) > 1 for items in fields[1]) else '1.0'), fields
+
+    def _parse_key(self, key):
+        view = memoryview(key)
+        if len(view) < _KEY_HEADER.size:
+            raise DecryptionError('Key file is truncated or corrupted')
+        magic, version, flags, width, codec, size, extension_size, tag_count, rd_key, count = \
+            _KEY_HEADER.unpack_from(view)
+        if version != _KEY_VERSION or width not in _WIDTH_FORMATS or codec not in _CODEC_NAMES:
+            raise DecryptionError(f'Unsupported key version {version}, index width {width} or codec {codec}')
+        try:
+            view = memoryview(_inflate(_CODEC_NAMES[codec], view[_KEY_HEADER.size:]))
+            position = 0
+            permutation = self._unpack_indices(view[position:position + size * width], width)
+            position += size * width
+            extension = self._unpack_indices(view[position:position + extension_size * 4], 4)
+            position += extension_size * 4
+            if flags & _FLAG_BYTES:
+                shuffled_list = bytes(permutation)
+                if len(set(shuffled_list)) != 256:
+                    raise ValueError('byte alphabet is not a permutation')
+            else:
+                alphabet = _STATIC_CHARS + tuple(chr(code) for code in extension)
+                shuffled_list = [alphabet[idx] for idx in permutation]
+            tagged_list = []
+            for _ in range(tag_count):
+                length, = _KEY_TAG_LENGTH.unpack_from(view, position)
+                position += _KEY_TAG_LENGTH.size
+                tagged_list.append(bytes(view[position:position + length]).decode('utf-8'))
+                position += length
+            if flags & _FLAG_MAC:
+                integrity = bytes(view[position:position + _KEY_MAC_SIZE])
+                position += _KEY_MAC_SIZE
+            else:
+                integrity = tuple(int.from_bytes(view[start:start + _KEY_SUM_WIDTH], 'little')
+                                  for start in (position, position + _KEY_SUM_WIDTH))
+                position += 2 * _KEY_SUM_WIDTH
+        except (TypeError, ValueError, IndexError, struct.error):
+            raise DecryptionError('Key file is truncated or corrupted') from None
+        if position != len(view):
+            raise DecryptionError('Key file is truncated or corrupted')
+        return rd_key, shuffled_list, tagged_list, integrity, None if count == _UNKNOWN_COUNT else count
+
+    def _token_integrity(self, data):
+        # Hashed from the token text itself, so that tokens no alphabet position produces still count.
+        bottom_level_integrity = 0
+        surface_level_integrity = 0
+        for items, count in Counter(data).items():
+            surface_level_integrity += self._seed(u_key=items, val_len=12) * count
+            bottom_level_integrity += self._seed(u_key=str(int(items, 2)), val_len=8) * count
+        return surface_level_integrity, bottom_level_integrity
 
     def _check_integrity(self, data, surface_level_integrity, bottom_level_integrity):
-        bottom_level_integrity_sum = 0
-        surface_level_integrity_sum = 0
-        for items in data:
-            surface_level_integrity_sum += self._seed(u_key=items, val_len=12)
-            bottom_level_integrity_sum += self._seed(u_key=str(int(items, 2)), val_len=8)
+        surface_level_integrity_sum, bottom_level_integrity_sum = self._token_integrity(data)
         if bottom_level_integrity_sum != bottom_level_integrity or surface_level_integrity_sum != surface_level_integrity:
             return False
         return True
 
-    def _decrypt(self):
-        if not isinstance(self.text, bytes):
-            raise DecryptionError(f'Bytes class data type is required, but provided {type(self.text)}')
+    # =============================== NumPy Backend ==========================================
+    # Character i is looked up in the alphabet rotated i times, so its index is (pos[c] + i) mod M and the
+    # whole text can be mapped in one vectorized pass instead of a rotate-and-lookup loop.
 
-        data = self._decompress(self.text).split()
-        data.reverse()
+    @staticmethod
+    def _alphabet_indices(text, alphabet):
+        codes = np.frombuffer(text.encode('utf-32-le', 'surrogatepass'), dtype='<u4')
+        table = np.full(max(map(ord, alphabet.chars)) + 1, -1, dtype=np.int64)
+        for char, pos in alphabet.positions.items():
+            table[ord(char)] = pos
+        positions = np.where(codes < table.size, table[np.minimum(codes, table.size - 1)], -1)
+        if (positions < 0).any():
+            raise ValueError('Text contains characters that are not in the alphabet')
+        steps = np.arange(codes.size, dtype=np.int64)
+        steps += alphabet.offset
+        indices = (positions + steps) % alphabet.size
+        for char, duplicate_positions in alphabet.duplicates.items():
+            mask = codes == ord(char)
+            rotated = [(pos + steps[mask]) % alphabet.size for pos in duplicate_positions]
+            indices[mask] = np.minimum.reduce(rotated)
+        return indices
 
-        rd_key, shuffled_list, tagged_list, integrity_s, integrity_b = self._load_key()
+    @staticmethod
+    def _token_limbs(indices, rd_key, new_seed):
+        # Tokens (idx * rd_key + new_seed) are wider than 64 bits, so they are carried as (high, low) uint64
+        # limbs. rd_key is multiplied in 32-bit halves so that no partial product can overflow.
+        indices = indices.astype(np.uint64)
+        low_product = indices * np.uint64(rd_key & _LIMB_32)
+        high_product = indices * np.uint64(rd_key >> 32)
+        low = low_product + ((high_product & np.uint64(_LIMB_32)) << np.uint64(32))
+        carry = (low < low_product).astype(np.uint64)
+        seeded = low + np.uint64(new_seed & _LIMB_64)
+        carry += (seeded < low).astype(np.uint64)
+        high = (high_product >> np.uint64(32)) + carry + np.uint64(new_seed >> 64)
+        return high, seeded
 
-        if self._check_integrity(data, integrity_s, integrity_b):
-            self._safe_delete('BARS.key')
-            spc_key = self._seed(self.key, 10)
-            seed = self._seed(str(rd_key * spc_key), 16) * spc_key
-            decrypted = ""
-            shuffled_list = self._rotate(shuffled_list, -1)
-            try:
-                for items in tqdm(data, desc='Decrypting'):
-                    decimal_index = int((int(items, 2) - seed) // rd_key)
-                    decrypted += shuffled_list[decimal_index]
-                    shuffled_list = self._rotate(shuffled_list, -1)
+    def _token_indices(self, high, low, rd_key, new_seed, size):
+        seed_low = np.uint64(new_seed & _LIMB_64)
+        borrow = (low < seed_low).astype(np.int64)
+        offset_high = high.astype(np.int64) - np.int64(new_seed >> 64) - borrow
+        offset_low = low - seed_low
+        approx = (offset_high.astype(np.float64) * 2.0 ** 64 + offset_low.astype(np.float64)) / rd_key
+        if approx.size and (approx.min() < -0.5 or approx.max() >= size - 0.5):
+            raise IndexError('alphabet index out of range')
+        indices = np.rint(approx).astype(np.int64)
+        check_high, check_low = self._token_limbs(indices, rd_key, new_seed)
+        if not (np.array_equal(check_high, high) and np.array_equal(check_low, low)):
+            raise IndexError('token is not on the key lattice')
+        return indices
+
+    def _index_integrity_numpy(self, indices, rd_key, new_seed):
+        counts = np.bincount(indices)
+        # A token's binary text depends only on its index, so each distinct token is formatted and hashed once.
+        binaries = np.empty(counts.size, dtype=object)
+        bottom_level_integrity = 0
+        surface_level_integrity = 0
+        for idx in np.flatnonzero(counts).tolist():
+            dic_idx = (idx * rd_key) + new_seed
+            binary = format(dic_idx, 'b')
+            bottom_level_integrity += self._seed(str(dic_idx), 8) * int(counts[idx])
+            surface_level_integrity += self._seed(binary, 12) * int(counts[idx])
+            binaries[idx] = binary + ' '
+        return binaries, surface_level_integrity, bottom_level_integrity
 
-                decrypted = decrypted[::-1]
+    def _tokens_to_indices_numpy(self, data, rd_key, seed, size):
+        unique_tokens = {}
+        codes = np.fromiter((unique_tokens.setdefault(items, len(unique_tokens)) for items in data),
+                            dtype=np.int64, count=len(data))
+        try:
+            values = [int(items, 2) for items in unique_tokens]
+            high = np.array([value >> 64 for value in values], dtype=np.uint64)[codes]
+            low = np.array([value & _LIMB_64 for value in values], dtype=np.uint64)[codes]
+        except (ValueError, OverflowError):
+            raise IndexError('token cannot be decoded') from None
+        return self._token_indices(high, low, rd_key, seed, size)
 
-                if len(tagged_list) != 0:
-                    decrypted = self._parse_text(text=decrypted, revert=True, tagged_dict=tagged_list)
+    @staticmethod
+    def _indices_to_text_numpy(indices, alphabet):
+        indices = np.asarray(indices, dtype=np.int64)
+        if indices.size and indices.max() >= alphabet.size:
+            raise IndexError('alphabet index out of range')
+        steps = np.arange(indices.size, dtype=np.int64)
+        steps += alphabet.offset
+        chars = np.array([ord(char) for char in alphabet.chars], dtype='<u4')
+        decrypted = chars[(indices - steps) % alphabet.size]
+        alphabet.rotate(1, indices.size)
+        return decrypted.tobytes().decode('utf-32-le', 'surrogatepass')
+
+    def _index_integrity(self, indices, rd_key, seed):
+        if self.backend == 'numpy':
+            # Bytes mode passes its payload itself, which np.asarray would parse as a number.
+            if isinstance(indices, (bytes, bytearray)):
+                indices = np.frombuffer(indices, dtype=np.uint8)
+            _, surface_level_integrity, bottom_level_integrity = self._index_integrity_numpy(
+                np.asarray(indices, dtype=np.int64), rd_key, seed)
+            return surface_level_integrity, bottom_level_integrity
+        return self._codebook(rd_key, seed).integrity(indices)
+
+    def _check_index_integrity(self, indices, rd_key, seed, surface_level_integrity, bottom_level_integrity):
+        surface_level_integrity_sum, bottom_level_integrity_sum = self._index_integrity(indices, rd_key, seed)
+        if bottom_level_integrity_sum != bottom_level_integrity or surface_level_integrity_sum != surface_level_integrity:
+            return False
+        return True
+
+    def _tokens_to_indices(self, data, rd_key, seed, size):
+        if self.backend == 'numpy':
+            return self._tokens_to_indices_numpy(data, rd_key, seed, size)
+        return self._codebook(rd_key, seed).indices(data, size)
+
+    def _indices_to_text(self, indices, alphabet, progress=False):
+        # Forward walk: the key holds the alphabet after N rotations, so starting at offset -N and rotating right
+        # once per token replays the encryption order without reversing anything.
+        if self.backend == 'numpy':
+            return self._indices_to_text_numpy(indices, alphabet)
+        decrypted = []
+        for idx in _progress(indices, 'Decrypting', progress):
+            decrypted.append(alphabet[idx])
+            alphabet.rotate(1)
+        return ''.join(decrypted)
+
+    def _decrypt(self):
+        decrypted = self._decrypt_document(self.text, progress=self.progress)
+        with self.stats.phase('gc'):
+            gc.collect()
+        if self.output_file:
+            with self.stats.phase('file_io'):
+                self._write_output(self.output_file, decrypted,
+                                   'Decrypted.bin' if isinstance(decrypted, bytes) else 'Decrypted.txt')
+        return decrypted
+
+    def _decrypt_document(self, text, progress=False):
+        # Decrypts one ciphertext with the session's key; clean-up and file output are left to the caller.
+        if not isinstance(text, (bytes, str)):
+            raise DecryptionError(f'Bytes class data type is required, but provided {type(text)}')
+
+        stats = self.stats
+        container = text[:len(_CONTAINER_MAGIC)] == _CONTAINER_MAGIC
+        legacy = False
+        with stats.phase('compression'):
+            if container:
+                payload, width = self._unpack_container(text)
+                data = self._unpack_indices(payload, width)
+            elif isinstance(text, str):
+                # Model 1.00/1.50 return their bit strings as uncompressed text.
+                data = text.split()
+                legacy = True
+            elif text[:1] in (b'', b'1'):
+                # ... and write them to a file the same way; every token starts with 1, a zlib stream never does.
+                data = text.decode('latin-1').split()
+                legacy = True
+            else:
+                data = self._decompress(text).split()
 
-                del integrity_s, integrity_b, spc_key, seed, shuffled_list, tagged_list, rd_key
-                gc.collect()
+        with stats.phase('key'):
+            rd_key, shuffled_list, tagged_list, integrity, _ = self._load_key(legacy)
+        with stats.phase('key_derivation'):
+            spc_key = self._special_key()
+            seed = self._seed(str(rd_key * spc_key), 16) * spc_key
+        raw = isinstance(shuffled_list, bytes)
+        if raw and (not container or width != 1):
+            self._discard_key(failed=True)
+            raise DecryptionError("Data Or Key Has Been Compromised Or Corrupted")
 
-                if self.output_file:
-                    with open('Decrypted.txt', 'w', encoding='utf-8') as dump_dcr_file:
-                        dump_dcr_file.write(decrypted)
+        if isinstance(integrity, bytes):
+            with stats.phase('integrity'):
+                mac = self._mac(rd_key)
+                mac.update(payload if container else b'')
+                intact = container and hmac.compare_digest(mac.digest(), integrity)
+        alphabet = _RotationEngine(shuffled_list, offset=-len(data))
+        segments = None
+        if self.workers > 1 and len(data) > _MIN_SEGMENT and not raw:
+            with stats.phase('token_loop'):
+                segments, surface_level_integrity, bottom_level_integrity = self._decrypt_parallel(
+                    payload if container else data, width if container else None, alphabet, rd_key, seed,
+                    check_sums=not isinstance(integrity, bytes))
+            if not isinstance(integrity, bytes):
+                intact = (surface_level_integrity, bottom_level_integrity) == tuple(integrity)
+        elif not isinstance(integrity, bytes):
+            with stats.phase('integrity'):
+                if raw:
+                    intact = self._index_integrity(payload, rd_key, seed) == tuple(integrity)
+                elif container:
+                    intact = self._check_index_integrity(data, rd_key, seed, *integrity)
+                else:
+                    intact = self._check_integrity(data, *integrity)
 
+        if intact:
+            self._discard_key()
+            try:
+                with stats.phase('token_loop'):
+                    if raw:
+                        decrypted = self._decrypt_raw(payload, alphabet)
+                    elif segments is not None:
+                        if None in segments:
+                            raise IndexError('alphabet index out of range')
+                        decrypted = ''.join(segments)
+                    else:
+                        if not container:
+                            data = self._tokens_to_indices(data, rd_key, seed, len(shuffled_list))
+                        decrypted = self._indices_to_text(data, alphabet, progress=progress)
+
+                if len(tagged_list) != 0:
+                    with stats.phase('parse'):
+                        decrypted = self._parse_text(text=decrypted, revert=True, tagged_dict=tagged_list)
                 return decrypted
 
             except IndexError:
-                self._safe_delete("BARS.key")
+                self._discard_key(failed=True)
                 raise DecryptionError("Data Or Key Has Been Compromised Or Corrupted")
-        self._safe_delete("BARS.key")
+        self._discard_key(failed=True)
         raise IntegrityViolation("Data Or Key Has Been Compromised")
 
+    def _decrypt_parallel(self, data, width, alphabet, rd_key, seed, check_sums):
+        """
+        Partitions the tokens into ranges, each starting from the rotation its position implies, and verifies and
+        decrypts them in worker processes. Returns the plaintext of each range in order (None where a range holds
+        an index outside the alphabet) and the summed integrity of all ranges.
+        """
+        count = len(data) // width if width else len(data)
+        segment = max(_MIN_SEGMENT, -(-count // self.workers))
+        starts = range(0, count, segment)
+        if width:
+            ranges = (data[start * width:(start + segment) * width] for start in starts)
+        else:
+            ranges = (data[start:start + segment] for start in starts)
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=min(self.workers, len(starts))) as executor:
+            results = list(executor.map(_decrypt_segment, repeat(self.backend), repeat(alphabet.chars),
+                                        (alphabet.offset + start for start in starts), ranges, repeat(width),
+                                        repeat(rd_key), repeat(seed), repeat(check_sums)))
+        segments = [decrypted for decrypted, _, _ in results]
+        return segments, sum(surface for _, surface, _ in results), sum(bottom for _, _, bottom in results)
+
+    def _decrypt_stream(self, blocks, max_length):
+        blocks = iter(blocks)
+        header = b''
+        for block in blocks:
+            header += block
+            if len(header) >= _CONTAINER_HEADER.size:
+                break
+        if header[:len(_CONTAINER_MAGIC)] != _CONTAINER_MAGIC or len(header) < _CONTAINER_HEADER.size:
+            raise DecryptionError('Streaming decryption requires a .bar container')
+        magic, version, width, flags, codec, count = _CONTAINER_HEADER.unpack_from(header)
+        if version != _CONTAINER_VERSION or width not in _WIDTH_FORMATS or codec not in _CODEC_NAMES:
+            raise DecryptionError(f'Unsupported container version {version}, token width {width} or codec {codec}')
+
+        stats = self.stats
+        with stats.phase('key'):
+            rd_key, shuffled_list, tagged_list, integrity, key_count = self._load_key()
+        if count == _UNKNOWN_COUNT:
+            count = key_count
+        if count is None:
+            raise DecryptionError('Token count is unknown, so the container can not be decrypted in order')
+        with stats.phase('key_derivation'):
+            spc_key = self._special_key()
+            seed = self._seed(str(rd_key * spc_key), 16) * spc_key
+        alphabet = _RotationEngine(shuffled_list, offset=-count)
+        # A tag split across two pieces can only be expanded once its closing bracket has arrived.
+        longest_tag = max(map(len, tagged_list), default=0)
+        raw = isinstance(shuffled_list, bytes)
+        if raw and width != 1:
+            raise DecryptionError("Data Or Key Has Been Compromised Or Corrupted")
+
+        mac = self._mac(rd_key) if isinstance(integrity, bytes) else None
+        codec = _CODEC_NAMES[codec]
+        indexed = flags & _FLAG_INDEXED
+        # A seekable container holds one compressed stream per chunk, and none at all when it is empty.
+        decompressor = _Decompressor('none' if indexed and not count else codec, count * width)
+        surface_level_integrity = 0
+        bottom_level_integrity = 0
+        checksum = 0
+        decoded = 0
+        pending = b''
+        held = ''
+        trailer = b''
+        try:
+            for data in chain((header[_CONTAINER_HEADER.size:],), blocks):
+                if decompressor.eof:
+                    trailer += data
+                    continue
+                while True:
+                    with stats.phase('compression'):
+                        inflated = decompressor.decompress(data, max_length)
+                    data = b''
+                    payload = pending + inflated
+                    usable = len(payload) - len(payload) % width
+                    pending = payload[usable:]
+                    indices = self._unpack_indices(payload[:usable], width)
+                    decoded += len(indices)
+                    with stats.phase('integrity'):
+                        checksum = zlib.crc32(payload[:usable], checksum)
+                        if mac is not None:
+                            mac.update(payload[:usable])
+                        else:
+                            surface, bottom = self._index_integrity(indices, rd_key, seed)
+                            surface_level_integrity += surface
+                            bottom_level_integrity += bottom
+                    with stats.phase('token_loop'):
+                        if raw:
+                            decrypted = self._decrypt_raw(payload[:usable], alphabet)
+                        else:
+                            decrypted = held + self._indices_to_text(indices, alphabet)
+                    held = ''
+                    if longest_tag:
+                        start = decrypted.rfind('⌈', max(0, len(decrypted) - longest_tag + 1))
+                        if start != -1 and '⌉' not in decrypted[start:]:
+                            decrypted, held = decrypted[:start], decrypted[start:]
+                        with stats.phase('parse'):
+                            decrypted = self._parse_text(text=decrypted, revert=True, tagged_dict=tagged_list)
+                    if decrypted:
+                        yield decrypted
+                    if decompressor.eof and indexed and decoded < count:
+                        data, decompressor = decompressor.unused_data, _Decompressor(codec)
+                        if data:
+                            continue
+                        break
+                    if decompressor.eof:
+                        trailer += decompressor.unused_data
+                        break
+                    if decompressor.needs_input:
+                        break
+        except IndexError:
+            self._discard_key()
+            raise DecryptionError("Data Or Key Has Been Compromised Or Corrupted")
+        except _CodecError:
+            raise DecryptionError('Encrypted container is truncated or corrupted') from None
+
+        if indexed:
+            # The index is only needed for random access; here it just has to fill the space its footer claims.
+            index_size = len(trailer) - _CONTAINER_TRAILER.size
+            try:
+                index_start, _ = self._index_bounds(trailer[index_size - _INDEX_FOOTER.size:index_size],
+                                                    _CONTAINER_HEADER.size + index_size)
+            except (_CodecError, struct.error):
+                raise DecryptionError('Encrypted container is truncated or corrupted') from None
+            if index_start != _CONTAINER_HEADER.size:
+                raise DecryptionError('Encrypted container is truncated or corrupted')
+            trailer = trailer[index_size:]
+        if not decompressor.eof or pending or len(trailer) != _CONTAINER_TRAILER.size:
+            raise DecryptionError('Encrypted container is truncated or corrupted')
+        trailer_count, trailer_checksum, end = _CONTAINER_TRAILER.unpack(trailer)
+        self._discard_key()
+        if mac is not None:
+            intact = hmac.compare_digest(mac.digest(), integrity)
+        else:
+            intact = (surface_level_integrity, bottom_level_integrity) == tuple(integrity)
+        if (not intact or end != _CONTAINER_END or trailer_count != decoded or decoded != count
+                or trailer_checksum != checksum):
+            raise IntegrityViolation("Data Or Key Has Been Compromised")
+        if held:
+            yield held
+
+    def _decrypt_range(self, src, start, length):
+        """
+        Decrypts length characters (bytes in bytes mode) of the plaintext from position start on, out of a seekable
+        container. Only the header, the trailer, the index entries a binary search visits and the chunks the range
+        falls in are read, so the cost does not grow with the container. Every entry and chunk that is used is
+        checked against the index MACs; the MAC or sums of the whole message are not, and the key is not shredded.
+        """
+        if start < 0 or length < 0:
+            raise ArgumentError(f'Start and length must not be negative, but provided {start} and {length}')
+        stats = self.stats
+        with _random_access(src) as (read, size):
+            try:
+                if size < _CONTAINER_HEADER.size + _INDEX_FOOTER.size + _CONTAINER_TRAILER.size:
+                    raise _CodecError('container is truncated')
+                magic, version, width, flags, codec, count = _CONTAINER_HEADER.unpack(read(0, _CONTAINER_HEADER.size))
+                body_end = size - _CONTAINER_TRAILER.size
+                trailer_count, _, end = _CONTAINER_TRAILER.unpack(read(body_end, _CONTAINER_TRAILER.size))
+            except (_CodecError, struct.error):
+                raise DecryptionError('Encrypted container is truncated or corrupted') from None
+            if magic != _CONTAINER_MAGIC or end != _CONTAINER_END or count not in (trailer_count, _UNKNOWN_COUNT):
+                raise DecryptionError('Encrypted container is truncated or corrupted')
+            if version != _CONTAINER_VERSION or width not in _WIDTH_FORMATS or codec not in _CODEC_NAMES:
+                raise DecryptionError(f'Unsupported container version {version}, token width {width} or codec {codec}')
+            if not flags & _FLAG_INDEXED:
+                raise DecryptionError('Random access requires a container written with seekable=True')
+            footer = read(body_end - _INDEX_FOOTER.size, _INDEX_FOOTER.size)
+            try:
+                index_start, chunk_count = self._index_bounds(footer, body_end)
+            except _CodecError:
+                raise DecryptionError('Encrypted container is truncated or corrupted') from None
+            count = trailer_count
+            _, chars = _INDEX_FOOTER.unpack(footer)
+
+            with stats.phase('key'):
+                rd_key, shuffled_list, tagged_list, _, _ = self._load_key()
+            raw = isinstance(shuffled_list, bytes)
+            if raw and width != 1:
+                raise DecryptionError("Data Or Key Has Been Compromised Or Corrupted")
+            index_key = self._index_key(rd_key)
+
+            def entry(number):
+                # (end of the chunk in the body, first token, first character, digest), once its MAC is verified
+                with stats.phase('integrity'):
+                    packed = read(index_start + number * _INDEX_ENTRY.size, _INDEX_ENTRY.size)
+                    *fields, tag = _INDEX_ENTRY.unpack(packed)
+                    signed = _INDEX_CONTEXT.pack(number, count, width, codec) + footer + packed[:_INDEX_SIGNED]
+                    if not hmac.compare_digest(hashlib.blake2b(signed, key=index_key, digest_size=16).digest(), tag):
+                        raise IntegrityViolation("Data Or Key Has Been Compromised")
+                return fields
+
+            stop = min(start + length, chars)
+            if start >= stop:
+                return b'' if raw else ''
+            low, high = 0, chunk_count - 1
+            while low < high:
+                middle = (low + high + 1) // 2
+                if entry(middle)[2] <= start:
+                    low = middle
+                else:
+                    high = middle - 1
+            chunks = [entry(low)]
+            following = entry(low + 1) if low + 1 < chunk_count else None
+            while following is not None and following[2] < stop:
+                chunks.append(following)
+                number = low + len(chunks)
+                following = entry(number) if number < chunk_count else None
+            begin = entry(low - 1)[0] if low else 0
+            tokens = [entry_tokens for _, entry_tokens, _, _ in chunks[1:]]
+            tokens.append(count if following is None else following[1])
+
+            with stats.phase('file_io'):
+                body = read(_CONTAINER_HEADER.size + begin, chunks[-1][0] - begin)
+            payloads = []
+            offset = begin
+            for (chunk_end, first_token, _, digest), next_token in zip(chunks, tokens):
+                try:
+                    with stats.phase('compression'):
+                        payload = _inflate(_CODEC_NAMES[codec], body[offset - begin:chunk_end - begin])
+                except _CodecError:
+                    raise DecryptionError('Encrypted container is truncated or corrupted') from None
+                offset = chunk_end
+                with stats.phase('integrity'):
+                    if (len(payload) != (next_token - first_token) * width or
+                            hashlib.blake2b(payload, digest_size=16).digest() != digest):
+                        raise IntegrityViolation("Data Or Key Has Been Compromised")
+                payloads.append(payload)
+
+        alphabet = _RotationEngine(shuffled_list, offset=chunks[0][1] - count)
+        payload = b''.join(payloads)
+        try:
+            with stats.phase('token_loop'):
+                if raw:
+                    decrypted = self._decrypt_raw(payload, alphabet)
+                else:
+                    decrypted = self._indices_to_text(self._unpack_indices(payload, width), alphabet)
+        except IndexError:
+            raise DecryptionError("Data Or Key Has Been Compromised Or Corrupted") from None
+        if tagged_list:
+            with stats.phase('parse'):
+                decrypted = self._parse_text(text=decrypted, revert=True, tagged_dict=tagged_list)
+        return decrypted[start - chunks[0][2]:stop - chunks[0][2]]
+
+
+def _encrypt_segment(config, chars, offset, converted_text, rd_key, new_seed):
+    # Worker process entry point for BARS._encrypt_parallel.
+    backend, legacy_format, integrity = config
+    session = BARS._session(None, output_file=False, backend=backend, legacy_format=legacy_format, integrity=integrity)
+    return session._encrypt_block(converted_text, _RotationEngine(chars, offset), rd_key, new_seed, progress=False)
+
+
+def _decrypt_segment(backend, chars, offset, data, width, rd_key, seed, check_sums):
+    # Worker process entry point for BARS._decrypt_parallel. data is a slice of the packed payload when width is
+    # set, or a slice of legacy bit string tokens otherwise.
+    session = BARS._session(None, output_file=False, backend=backend)
+    surface_level_integrity = bottom_level_integrity = 0
+    if width:
+        data = session._unpack_indices(data, width)
+        if check_sums:
+            surface_level_integrity, bottom_level_integrity = session._index_integrity(data, rd_key, seed)
+    elif check_sums:
+        surface_level_integrity, bottom_level_integrity = session._token_integrity(data)
+    try:
+        if not width:
+            data = session._tokens_to_indices(data, rd_key, seed, len(chars))
+        decrypted = session._indices_to_text(data, _RotationEngine(chars, offset))
+    except IndexError:
+        decrypted = None
+    return decrypted, surface_level_integrity, bottom_level_integrity
+
+
+def encrypt(usr_key, text, stats: BARSStats = None, key_file=None, output_file=False, **options):
+    """
+    Encrypts text (or bytes, in bytes mode) in memory and returns (ciphertext, key). No file is read or written
+    unless key_file or output_file (paths or binary file objects, as for BARS) are given.
+    Every call has its own key, so calls can run concurrently in threads. Options are passed on to BARS. Unlike a
+    BARS call, no progress bar is shown and no garbage collection is forced. Phase timings are added to stats when
+    given.
+    """
+    session = BARS._session(usr_key, output_file=output_file, key_file=key_file, **options)
+    if stats is not None:
+        session.stats = stats
+    encrypted = session._encrypt_document(text, progress=session.progress)
+    if output_file:
+        with session.stats.phase('file_io'):
+            session._write_output(output_file, encrypted, 'Encrypted.bar')
+    return encrypted, session.key_data
+
+
+def decrypt(usr_key, ciphertext, key, stats: BARSStats = None, key_file=None, output_file=False, **options):
+    """
+    Decrypts ciphertext with the key returned by encrypt(), in memory. When key is None it is read from key_file,
+    and shredded once the ciphertext is decrypted, as in BARS. The plaintext is also written to output_file when
+    given. Options are passed on to BARS.
+    """
+    session = BARS._session(usr_key, output_file=output_file, key_file=key_file, key_data=key, **options)
+    if stats is not None:
+        session.stats = stats
+    decrypted = session._decrypt_document(ciphertext, progress=session.progress)
+    if output_file:
+        with session.stats.phase('file_io'):
+            session._write_output(output_file, decrypted,
+                                  'Decrypted.bin' if isinstance(decrypted, bytes) else 'Decrypted.txt')
+    return decrypted
+
+
+class BARSCipher:
+    """
+    Long-lived cipher for one user key. The key material that does not depend on the message (the special key
+    derived from usr_key) is computed once here, and encrypt()/decrypt() can then be called any number of times.
+    Options are validated once and passed on to every call, as with encrypt(). Each call works on its own
+    session, so one BARSCipher can be shared between threads. Like encrypt()/decrypt(), it never shows a progress
+    bar, writes a file or forces a garbage collection. Use it as a context manager, or call close(), to drop the
+    key material.
+
+    Example: with BARSCipher(key, backend='numpy') as cipher: ciphertext, message_key = cipher.encrypt(text)
+    """
+
+    def __init__(self, usr_key, **options):
+        # Validates the options before any work is done.
+        BARS._session(usr_key, output_file=False, key_file=None, **options)
+        self._options = options
+        self._key = usr_key
+        self._spc_key = BARS._seed(u_key=usr_key, val_len=10)
+
+    def _session(self, stats):
+        if self._key is None:
+            raise BARSError('BARSCipher is closed')
+        session = BARS._session(self._key, output_file=False, key_file=None, **self._options)
+        session._spc_key = self._spc_key
+        if stats is not None:
+            session.stats = stats
+        return session
+
+    def encrypt(self, text, stats: BARSStats = None):
+        """
+        Encrypts text (or bytes, in bytes mode) and returns (ciphertext, key). Phase timings are added to stats when
+        given.
+        """
+        session = self._session(stats)
+        return session._encrypt_document(text), session.key_data
+
+    def decrypt(self, ciphertext, key, stats: BARSStats = None):
+        """
+        Decrypts ciphertext of any release with its key. Phase timings are added to stats when given.
+        """
+        session = self._session(stats)
+        session.key_data = key
+        return session._decrypt_document(ciphertext)
+
+    def decrypt_range(self, src, key, start: int, length: int, stats: BARSStats = None):
+        """
+        Decrypts length characters of the plaintext from position start on, out of a seekable container (see
+        decrypt_range()).
+        """
+        session = self._session(stats)
+        session.key_data = key
+        return session._decrypt_range(src, start, length)
+
+    def close(self):
+        self._key = self._spc_key = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class BatchResult(list):
+    """
+    Results of encrypt_many()/decrypt_many()/migrate() in document order, with the wall time of the batch in seconds,
+    its throughput in messages per second and the phase timings of all batches added together.
+    """
+
+    def __init__(self, results, elapsed, stats=None):
+        super().__init__(results)
+        self.elapsed = elapsed
+        self.rate = len(self) / elapsed if elapsed else float('inf')
+        self.stats = stats if stats is not None else BARSStats()
+
+
+def _run_batch(jobs, workers, batch_size, worker, *args):
+    began = time.perf_counter()
+    jobs = list(jobs)
+    batches = [jobs[start:start + batch_size] for start in range(0, len(jobs), batch_size)]
+    if workers > 1 and len(batches) > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=min(workers, len(batches))) as executor:
+            outcomes = list(executor.map(worker, repeat(args), batches))
+    else:
+        outcomes = [worker(args, batch) for batch in batches]
+    stats = BARSStats()
+    for _, batch_stats in outcomes:
+        stats.merge(batch_stats)
+    return BatchResult(chain.from_iterable(results for results, _ in outcomes), time.perf_counter() - began, stats)
+
+
+def _encrypt_batch(config, documents):
+    # Worker entry point for encrypt_many: one session, and so one derivation of the user key, per batch.
+    usr_key, backend, legacy_format, integrity, unknown_chars, compression, compression_level, seekable = config
+    session = BARS._session(usr_key, output_file=False, backend=backend, legacy_format=legacy_format,
+                            integrity=integrity, unknown_chars=unknown_chars, key_file=None, compression=compression,
+                            compression_level=compression_level, seekable=seekable)
+    return [(session._encrypt_document(text), session.key_data) for text in documents], session.stats
+
+
+def _decrypt_batch(config, pairs):
+    # Worker entry point for decrypt_many.
+    usr_key, backend = config
+    session = BARS._session(usr_key, output_file=False, backend=backend, key_file=None)
+    decrypted = []
+    for ciphertext, key in pairs:
+        session.key_data = key
+        decrypted.append(session._decrypt_document(ciphertext))
+    return decrypted, session.stats
+
+
+def encrypt_many(usr_key, documents, workers: int = 1, batch_size: int = 256, backend: str = 'python',
+                 legacy_format: bool = False, integrity: str = None, unknown_chars: str = None,
+                 compression: str = 'zlib', compression_level: int = None, seekable: bool = False):
+    """
+    Encrypts many documents with one user key, in memory, and returns a BatchResult of (ciphertext, key) pairs.
+    The user key is derived once per batch of batch_size documents, and no garbage collection, progress bar or file
+    output happens per document. With workers > 1 the batches are spread over a process pool.
+    """
+    # Validates the options before any work is done.
+    BARS._session(usr_key, output_file=False, backend=backend, legacy_format=legacy_format, integrity=integrity,
+                  workers=workers, unknown_chars=unknown_chars, compression=compression,
+                  compression_level=compression_level, seekable=seekable)
+    return _run_batch(documents, workers, batch_size, _encrypt_batch, usr_key, backend, legacy_format, integrity,
+                      unknown_chars, compression, compression_level, seekable)
+
+
+def decrypt_many(usr_key, pairs, workers: int = 1, batch_size: int = 256, backend: str = 'python'):
+    """
+    Decrypts the (ciphertext, key) pairs returned by encrypt_many() and returns a BatchResult of plaintexts.
+    The first document that fails raises, as BARS would.
+    """
+    BARS._session(usr_key, output_file=False, backend=backend, workers=workers)
+    return _run_batch(pairs, workers, batch_size, _decrypt_batch, usr_key, backend)
+
+
+def detect_version(key):
+    """
+    Returns the release whose format a key is in: '1.0' or '1.5' (Seq.key of Model 1.00/1.50, with uncompressed bit
+    string text), '2.0' (text key and compressed bit strings of Model 2.00 and legacy_format) or 'bar' (binary key
+    and .bar container). A Model 1.50 message without unknown characters is reported as '1.0', which it matches.
+    Decryption detects the format by itself; this is for reporting.
+    """
+    if key[:len(_KEY_MAGIC)] == _KEY_MAGIC:
+        return 'bar'
+    return BARS._parse_text_key(key)[0]
+
+
+def _migrate_batch(config, pairs):
+    # Worker entry point for migrate: one session reads the old archives, another writes the new ones.
+    usr_key, backend, integrity, compression, compression_level, verify, seekable = config
+    reader = BARS._session(usr_key, output_file=False, backend=backend, key_file=None)
+    writer = BARS._session(usr_key, output_file=False, backend=backend, integrity=integrity, key_file=None,
+                           compression=compression, compression_level=compression_level, seekable=seekable)
+    writer.stats = reader.stats
+    migrated = []
+    for ciphertext, key in pairs:
+        reader.key_data = key
+        decrypted = reader._decrypt_document(ciphertext)
+        container = writer._encrypt_document(decrypted)
+        if verify:
+            reader.key_data = writer.key_data
+            if reader._decrypt_document(container) != decrypted:
+                raise IntegrityViolation('Migrated message does not decrypt to the original plaintext')
+        migrated.append((container, writer.key_data))
+    return migrated, reader.stats
+
+
+def migrate(usr_key, pairs, workers: int = 1, batch_size: int = 256, backend: str = 'python', integrity: str = 'mac',
+            compression: str = 'zlib', compression_level: int = None, verify: bool = True, seekable: bool = False):
+    """
+    Re-encrypts (ciphertext, key) pairs of any release (see detect_version()) into .bar containers with binary keys
+    and returns a BatchResult of the new (container, key) pairs, with the throughput of the migration.
+    Model 1.00/1.50 ciphertexts may be given as read from their files or as the text they returned. With verify,
+    every new container is decrypted again and compared with the old plaintext, and IntegrityViolation is raised on
+    a mismatch. With workers > 1 the batches are spread over a process pool.
+    """
+    BARS._session(usr_key, output_file=False, backend=backend, integrity=integrity, workers=workers,
+                  compression=compression, compression_level=compression_level, seekable=seekable)
+    return _run_batch(pairs, workers, batch_size, _migrate_batch, usr_key, backend, integrity, compression,
+                      compression_level, verify, seekable)
+
+
+def encrypt_stream(usr_key, chunks, backend: str = 'python', integrity: str = 'mac', key_file='BARS.key',
+                   stats: BARSStats = None, compression: str = 'zlib', compression_level: int = None,
+                   seekable: bool = False):
+    """
+    Encrypts an iterable of text chunks, or of bytes chunks in bytes mode, into a .bar container, yielding the
+    container block by block.
+    The rotation offset, integrity sums and compressor state are carried across chunks, so memory stays bounded by
+    the chunk size rather than the input size. The key is written to key_file (a path or a binary file object) once
+    the input is exhausted. Phase timings are added to stats when given; time spent by the consumer is not counted.
+    With seekable=True the container ends with a chunk index, so decrypt_range() can read parts of it.
+
+    Example: encrypt_stream(key, iter(lambda: src.read(1 << 20), ''))
+    """
+    session = BARS._session(usr_key, backend=backend, integrity=integrity, unknown_chars='tag', key_file=key_file,
+                            compression=compression, compression_level=compression_level, seekable=seekable)
+    if stats is not None:
+        session.stats = stats
+    return session._encrypt_stream(chunks)
+
+
+def decrypt_stream(usr_key, blocks, backend: str = 'python', max_length: int = 1 << 20, key_file='BARS.key',
+                   key_data: bytes = None, stats: BARSStats = None):
+    """
+    Decrypts a .bar container from an iterable of byte blocks, yielding plaintext in document order.
+    Decompression is bounded by max_length bytes per step, so the first part of the plaintext is available before
+    the rest of the container has been read. Integrity is verified once the trailer arrives; IntegrityViolation
+    is raised at that point, so the plaintext must only be trusted after the generator is exhausted.
+    The key is taken from key_data when given, otherwise from key_file. Phase timings are added to stats when given.
+    """
+    session = BARS._session(usr_key, backend=backend, key_file=key_file, key_data=key_data)
+    if stats is not None:
+        session.stats = stats
+    return session._decrypt_stream(blocks, max_length)
+
+
+def decrypt_range(usr_key, src, start: int, length: int, key_file='BARS.key', key_data: bytes = None,
+                  backend: str = 'python', stats: BARSStats = None):
+    """
+    Decrypts length characters (bytes in bytes mode) of the plaintext from position start on, out of a container
+    written with seekable=True. src is the container as bytes, a path or a seekable binary file object; only the
+    chunks that overlap the range are read, decompressed and decrypted. The key is taken from key_data when given,
+    otherwise from key_file, and is left in place. Phase timings are added to stats when given.
+
+    Example: decrypt_range(key, 'log.bar', 10 ** 9, 4096, key_file='log.key')
+    """
+    session = BARS._session(usr_key, output_file=False, backend=backend, key_file=key_file, key_data=key_data)
+    if stats is not None:
+        session.stats = stats
+    return session._decrypt_range(src, start, length)
+
+
+def _mapped_blocks(path, block_size):
+    # Yields copies of block_size slices of a read-only memory map. Pages that have been read are handed back to
+    # the page cache, so the resident size does not grow with the file.
+    import mmap
+    with open(path, 'rb') as source:
+        if os.fstat(source.fileno()).st_size == 0:
+            return  # an empty file can not be mapped
+        with mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            advise = hasattr(mapped, 'madvise') and hasattr(mmap, 'MADV_DONTNEED')
+            if advise:
+                mapped.madvise(mmap.MADV_SEQUENTIAL)
+            released = 0
+            for start in range(0, len(mapped), block_size):
+                yield mapped[start:start + block_size]
+                done = min(start + block_size, len(mapped)) // mmap.PAGESIZE * mmap.PAGESIZE
+                if advise and done > released:
+                    mapped.madvise(mmap.MADV_DONTNEED, released, done - released)
+                    released = done
+
+
+def _decoded_chunks(blocks, stats):
+    # The incremental decoder keeps a code point split across two blocks until its last byte arrives.
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    for block in blocks:
+        with stats.phase('parse'):
+            text = decoder.decode(block)
+        if text:
+            yield text
+    decoder.decode(b'', final=True)
+
+
+@contextlib.contextmanager
+def _file_sink(target, source=None):
+    # Buffered binary sink for a path or a binary file object. A file created here is removed if writing fails.
+    # Opening it truncates the file, so it must not be source, the file being read.
+    if hasattr(target, 'write'):
+        yield target
+        return
+    if source is not None and os.path.exists(target) and os.path.samefile(source, target):
+        raise ArgumentError(f'Output file {target} is the input file')
+    with open(target, 'wb', buffering=_FILE_BUFFER) as sink:
+        try:
+            yield sink
+        except BaseException:
+            sink.close()
+            os.remove(target)
+            raise
+
+
+def _read_at(source, offset, size):
+    source.seek(offset)
+    return source.read(size)
+
+
+@contextlib.contextmanager
+def _random_access(src):
+    # Yields read(offset, size) and the size of a container given as bytes, a path or a seekable binary file object.
+    if isinstance(src, (bytes, bytearray, memoryview)):
+        view = memoryview(src)
+        yield (lambda offset, size: bytes(view[offset:offset + size])), len(view)
+        return
+    with contextlib.ExitStack() as stack:
+        source = src if hasattr(src, 'read') else stack.enter_context(open(src, 'rb'))
+        yield partial(_read_at, source), source.seek(0, os.SEEK_END)
+
+
+def encrypt_file(usr_key, src, dst, key_file='BARS.key', chunk_size: int = 1 << 20, backend: str = 'python',
+                 integrity: str = 'mac', compression: str = 'zlib', compression_level: int = None,
+                 stats: BARSStats = None, binary: bool = False, seekable: bool = False):
+    """
+    Encrypts the UTF-8 text file src into a .bar container at dst (a path or a binary file object) with
+    encrypt_stream(). src is memory mapped and decoded chunk_size bytes at a time, so memory use depends on
+    chunk_size and not on the size of the file. With binary=True the file is encrypted as bytes, without decoding,
+    and any file type can be used. Returns the BARSStats of the run.
+    """
+    stats = BARSStats() if stats is None else stats
+    chunks = _mapped_blocks(src, chunk_size)
+    if not binary:
+        chunks = _decoded_chunks(chunks, stats)
+    with _file_sink(dst, src) as sink:
+        for block in encrypt_stream(usr_key, chunks, backend=backend, integrity=integrity, key_file=key_file,
+                                    stats=stats, compression=compression, compression_level=compression_level,
+                                    seekable=seekable):
+            with stats.phase('file_io'):
+                sink.write(block)
+    return stats
+
+
+def decrypt_file(usr_key, src, dst, key_file='BARS.key', key_data: bytes = None, chunk_size: int = 1 << 20,
+                 backend: str = 'python', stats: BARSStats = None):
+    """
+    Decrypts the .bar container src into the UTF-8 text file dst (a path or a binary file object) with
+    decrypt_stream(), reading src through a memory map chunk_size bytes at a time. A container encrypted in bytes
+    mode is written back byte for byte. Integrity is only known once
+    the whole container has been read; if it fails, a dst file created here is removed. Returns the BARSStats of
+    the run.
+    """
+    stats = BARSStats() if stats is None else stats
+    with _file_sink(dst, src) as sink:
+        for text in decrypt_stream(usr_key, _mapped_blocks(src, chunk_size), backend=backend, max_length=chunk_size,
+                                   key_file=key_file, key_data=key_data, stats=stats):
+            with stats.phase('file_io'):
+                sink.write(text.encode('utf-8') if isinstance(text, str) else text)
+    return stats
+
+
+class _AsyncChunks:
+    """
+    Sync iterator over an async iterable, for a stream generator that runs in an executor thread. Each item is
+    awaited on the event loop while the thread waits for it, and the wait can be cancelled from the loop.
+    """
+
+    def __init__(self, chunks, loop):
+        self.chunks = chunks.__aiter__()
+        self.loop = loop
+        self.pending = None
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        import asyncio
+        self.pending = asyncio.run_coroutine_threadsafe(self._next(), self.loop)
+        try:
+            return self.pending.result()
+        except StopAsyncIteration:
+            raise StopIteration from None
+
+    async def _next(self):
+        return await self.chunks.__anext__()
+
+    def cancel(self):
+        if self.pending is not None:
+            self.pending.cancel()
+
+
+async def _drive_stream(stream, executor, source=None):
+    # Advances a sync stream generator one step at a time in the executor. The next step only starts when the
+    # consumer asks for it, and cancellation takes effect once the step in flight has finished.
+    import asyncio
+    loop = asyncio.get_running_loop()
+    end = object()
+    try:
+        while True:
+            step = loop.run_in_executor(executor, next, stream, end)
+            try:
+                item = await asyncio.shield(step)
+            except asyncio.CancelledError:
+                if source is not None:
+                    source.cancel()
+                await asyncio.wait([step])
+                if not step.cancelled():
+                    step.exception()  # the step was abandoned, so whatever it raised is not reported
+                raise
+            if item is end:
+                return
+            yield item
+    finally:
+        stream.close()
+
+
+async def aencrypt(usr_key, text, executor=None, **options):
+    """
+    Coroutine version of encrypt(): the encryption, and any key_file/output_file writes, run in executor (the loop's
+    default executor when None), so files can be written without blocking the loop. Options must be picklable when
+    executor is a process pool, and stats is only filled in when it runs in a thread.
+    """
+    import asyncio
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, partial(encrypt, usr_key, text, **options))
+
+
+async def adecrypt(usr_key, ciphertext, key, executor=None, **options):
+    """
+    Coroutine version of decrypt(); see aencrypt().
+    """
+    import asyncio
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, partial(decrypt, usr_key, ciphertext, key, **options))
+
+
+async def aencrypt_stream(usr_key, chunks, executor=None, backend: str = 'python', integrity: str = 'mac',
+                          key_file='BARS.key', stats: BARSStats = None, compression: str = 'zlib',
+                          compression_level: int = None, seekable: bool = False):
+    """
+    Async generator version of encrypt_stream(). chunks may be an iterable or an async iterable. A sync iterable is
+    read in the executor, so file reads do not block the loop. Only one chunk is in flight at a time, so a slow
+    consumer holds back the producer instead of letting the container pile up in memory. executor must be a
+    thread pool (the loop's default executor when None).
+    """
+    import asyncio
+    source = _AsyncChunks(chunks, asyncio.get_running_loop()) if hasattr(chunks, '__aiter__') else None
+    stream = encrypt_stream(usr_key, chunks if source is None else source, backend=backend, integrity=integrity,
+                            key_file=key_file, stats=stats, compression=compression,
+                            compression_level=compression_level, seekable=seekable)
+    async for block in _drive_stream(stream, executor, source):
+        yield block
+
+
+async def adecrypt_stream(usr_key, blocks, executor=None, backend: str = 'python', max_length: int = 1 << 20,
+                          key_file='BARS.key', key_data: bytes = None, stats: BARSStats = None):
+    """
+    Async generator version of decrypt_stream(); see aencrypt_stream(). As with decrypt_stream(), the plaintext must
+    only be trusted after the generator is exhausted.
+    """
+    import asyncio
+    source = _AsyncChunks(blocks, asyncio.get_running_loop()) if hasattr(blocks, '__aiter__') else None
+    stream = decrypt_stream(usr_key, blocks if source is None else source, backend=backend, max_length=max_length,
+                            key_file=key_file, key_data=key_data, stats=stats)
+    async for text in _drive_stream(stream, executor, source):
+        yield text
+
 
 if __name__ == '__main__':
     import time as t
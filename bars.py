@@ -0,0 +1,298 @@
+"""
+Command line interface of Model_V2_0_0.
+
+Encrypts, decrypts, verifies and benchmarks files, directories and glob patterns, spread over a pool of -j worker
+processes. Every file gets its own container and key next to it (or under --output-dir), so nothing is written to
+a shared BARS.key:
+
+    python bars.py encrypt -j 8 exports/ 'reports/**/*.csv'     # a.txt -> a.txt.bar and a.txt.key
+    python bars.py verify -j 8 exports/                          # checks every a.txt.bar against a.txt.key
+    python bars.py decrypt -j 8 exports/                         # a.txt.bar + a.txt.key -> a.txt
+    python bars.py bench -j 8 1.txt 2.txt 3.txt                  # in-memory round trips, nothing is written
+
+The user key is read from the environment variable named by --key-env (BARS_KEY by default), or prompted for when
+it is not set, so it never shows up in the process list. Directories are walked recursively; encrypt skips the .bar
+and .key files it finds there, while decrypt and verify only accept .bar files. Nothing runs when two inputs would
+be written to the same output. Each command prints a throughput summary and exits with status 1 when any file
+failed. Like decryption through BARS, decrypt shreds a key once its container has been decrypted, unless --keep-key
+is given.
+
+Code written and modified by : Arnab Pramanik
+"""
+
+import argparse
+import getpass
+import glob
+import os
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import Model_V2_0_0 as model
+
+CONTAINER_SUFFIX = '.bar'
+KEY_SUFFIX = '.key'
+KEY_ENV = 'BARS_KEY'
+CODECS = ('zlib', 'none', 'bz2', 'lzma')
+
+
+# =============================== Inputs ==========================================
+
+
+def _walk(root):
+    for directory, _, names in os.walk(root):
+        for name in sorted(names):
+            path = os.path.join(directory, name)
+            yield path, os.path.relpath(path, root)
+
+
+def _has_magic(path):
+    return any(char in path for char in '*?[')
+
+
+def _glob_root(pattern):
+    # The directory part of a glob pattern before its first wildcard.
+    parts = []
+    for part in pattern.split(os.sep):
+        if _has_magic(part):
+            break
+        parts.append(part)
+    return os.sep.join(parts) or (os.sep if pattern.startswith(os.sep) else os.curdir)
+
+
+def expand(paths, containers=False):
+    """
+    Returns the (path, relative path) of every file named by paths, in order and without duplicates. Files found
+    in directories are relative to that directory and files matched by a glob pattern are relative to the
+    pattern's directory part, so both keep their layout under an output directory. Files named directly are
+    relative to the deepest directory that holds them all. With containers, directories only give their .bar
+    files; otherwise .bar and .key files found in directories are skipped.
+    """
+    found = {}
+    for path in paths:
+        if _has_magic(path):
+            root = _glob_root(path)
+            matches = [(match, os.path.relpath(match, root)) for match in sorted(glob.glob(path, recursive=True))]
+        else:
+            matches = [(path, None)]
+        for match, relative in matches:
+            if os.path.isdir(match):
+                for file, relative in _walk(match):
+                    if containers:
+                        wanted = file.endswith(CONTAINER_SUFFIX)
+                    else:
+                        wanted = not file.endswith((CONTAINER_SUFFIX, KEY_SUFFIX))
+                    if wanted:
+                        found.setdefault(os.path.abspath(file), relative)
+            else:
+                found.setdefault(os.path.abspath(match), relative)
+    named = [path for path, relative in found.items() if relative is None]
+    if named:
+        root = os.path.commonpath([os.path.dirname(path) for path in named])
+        for path in named:
+            found[path] = os.path.relpath(path, root)
+    return list(found.items())
+
+
+def _stem(path):
+    return path[:-len(CONTAINER_SUFFIX)] if path.endswith(CONTAINER_SUFFIX) else path
+
+
+def _destination(path, relative, output_dir, suffix=''):
+    if output_dir is None:
+        return path + suffix
+    return os.path.join(output_dir, relative + suffix)
+
+
+# =============================== Jobs ==========================================
+# Every job runs in a worker process and reports (path, input bytes, output bytes, error) instead of raising, so
+# one bad file does not stop the rest of the batch.
+
+
+def _encrypt_job(usr_key, options, job):
+    src, dst, key_path = job
+    try:
+        for path in (dst, key_path):
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        model.encrypt_file(usr_key, src, dst, key_file=key_path, **options)
+        return src, os.path.getsize(src), os.path.getsize(dst), None
+    except Exception as e:
+        return src, 0, 0, f'{type(e).__name__}: {e}'
+
+
+def _decrypt_job(usr_key, options, job):
+    src, dst, key_path, keep_key = job
+    try:
+        os.makedirs(os.path.dirname(dst) or '.', exist_ok=True)
+        if keep_key:
+            with open(key_path, 'rb') as key_file:
+                options = dict(options, key_data=key_file.read())
+        model.decrypt_file(usr_key, src, dst, key_file=key_path, **options)
+        return src, os.path.getsize(src), os.path.getsize(dst), None
+    except Exception as e:
+        return src, 0, 0, f'{type(e).__name__}: {e}'
+
+
+def _verify_job(usr_key, options, job):
+    # Decrypts into os.devnull: the whole container is read and authenticated, and the key is left in place.
+    src, key_path = job
+    try:
+        with open(key_path, 'rb') as key_file:
+            key = key_file.read()
+        with open(os.devnull, 'wb') as sink:
+            model.decrypt_file(usr_key, src, sink, key_data=key, **options)
+        return src, os.path.getsize(src), 0, None
+    except Exception as e:
+        return src, 0, 0, f'{type(e).__name__}: {e}'
+
+
+def _bench_job(usr_key, options, job):
+    src, binary = job
+    try:
+        with open(src, 'rb') as source:
+            contents = source.read()
+        text = contents if binary else contents.decode('utf-8')
+        ciphertext, key = model.encrypt(usr_key, text, **options)
+        if model.decrypt(usr_key, ciphertext, key, backend=options['backend']) != text:
+            return src, 0, 0, 'decrypted contents do not match the file'
+        return src, len(contents), len(ciphertext), None
+    except Exception as e:
+        return src, 0, 0, f'{type(e).__name__}: {e}'
+
+
+def run(worker, jobs, workers=1, log=sys.stderr):
+    """
+    Runs worker over jobs, in a process pool of workers processes when workers > 1, and returns the summary:
+    file counts, input and output bytes, wall time, throughput and the failures as (path, error) pairs.
+    """
+    began = time.perf_counter()
+    if workers > 1 and len(jobs) > 1:
+        # Jobs are handed out in chunks, so tens of thousands of small files do not cost one round trip each.
+        chunk_size = max(1, min(64, len(jobs) // (workers * 4)))
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as executor:
+            results = list(executor.map(worker, jobs, chunksize=chunk_size))
+    else:
+        results = [worker(job) for job in jobs]
+    elapsed = time.perf_counter() - began
+    failures = [(path, error) for path, _, _, error in results if error is not None]
+    for path, error in failures:
+        print(f'{path}: {error}', file=log)
+    input_bytes = sum(size for _, size, _, _ in results)
+    return {
+        'files': len(results),
+        'failed': len(failures),
+        'input_bytes': input_bytes,
+        'output_bytes': sum(size for _, _, size, _ in results),
+        'elapsed_s': elapsed,
+        'files_per_s': len(results) / elapsed if elapsed else None,
+        'mbps': input_bytes / (1 << 20) / elapsed if elapsed else None,
+        'failures': failures,
+    }
+
+
+def _summary(command, report):
+    files_per_s = f'{report["files_per_s"]:.1f}' if report['files_per_s'] is not None else '-'
+    mbps = f'{report["mbps"]:.3f}' if report['mbps'] is not None else '-'
+    return (f'{command}: {report["files"] - report["failed"]}/{report["files"]} files ok, '
+            f'{report["input_bytes"]} B in, {report["output_bytes"]} B out, {report["elapsed_s"]:.3f} s, '
+            f'{files_per_s} files/s, {mbps} MB/s')
+
+
+# =============================== Main ==========================================
+
+
+def _user_key(name):
+    usr_key = os.environ.get(name)
+    if usr_key is None:
+        usr_key = getpass.getpass('Key: ')
+    if not usr_key:
+        raise SystemExit('bars: the user key is empty')
+    return usr_key
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='bars', description='Encrypt and decrypt files with BARS.')
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('paths', nargs='+', help='files, directories or glob patterns')
+    common.add_argument('-j', '--jobs', type=int, default=1, help='number of worker processes')
+    common.add_argument('--key-env', default=KEY_ENV,
+                        help=f'environment variable holding the user key (default: {KEY_ENV}, prompted if unset)')
+    common.add_argument('--backend', default='python', choices=('python', 'numpy'))
+    common.add_argument('--chunk-size', type=int, default=1 << 20, help='bytes read per step')
+    encoding = argparse.ArgumentParser(add_help=False)
+    encoding.add_argument('--binary', action='store_true', help='encrypt the files as bytes instead of UTF-8 text')
+    encoding.add_argument('--integrity', default='mac', choices=('mac', 'sum'))
+    encoding.add_argument('--compression', default='zlib', choices=CODECS)
+    encoding.add_argument('--compression-level', type=int)
+    encoding.add_argument('--seekable', action='store_true', help='append a chunk index for decrypt_range()')
+    output = argparse.ArgumentParser(add_help=False)
+    output.add_argument('-o', '--output-dir', help='write outputs here instead of next to their inputs')
+    output.add_argument('-f', '--force', action='store_true', help='overwrite existing outputs')
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('encrypt', parents=[common, encoding, output], help='encrypt files into .bar containers')
+    decrypt_parser = commands.add_parser('decrypt', parents=[common, output], help='decrypt .bar containers')
+    decrypt_parser.add_argument('--keep-key', action='store_true', help='do not shred keys after decryption')
+    commands.add_parser('verify', parents=[common], help='check .bar containers against their keys')
+    commands.add_parser('bench', parents=[common, encoding], help='time in-memory round trips of files')
+    args = parser.parse_args(argv)
+    if args.jobs < 1:
+        parser.error(f'-j must be a positive integer, but provided {args.jobs}')
+
+    files = expand(args.paths, containers=args.command in ('decrypt', 'verify'))
+    if not files:
+        parser.error('no input files found')
+    usr_key = _user_key(args.key_env)
+    options = {'backend': args.backend}
+    jobs, skipped, rejected = [], [], []
+    if args.command == 'encrypt':
+        options.update(chunk_size=args.chunk_size, integrity=args.integrity, compression=args.compression,
+                       compression_level=args.compression_level, binary=args.binary, seekable=args.seekable)
+        worker = _encrypt_job
+        for path, relative in files:
+            dst = _destination(path, relative, args.output_dir, CONTAINER_SUFFIX)
+            key_path = _destination(path, relative, args.output_dir, KEY_SUFFIX)
+            if not args.force and (os.path.exists(dst) or os.path.exists(key_path)):
+                skipped.append(dst)
+            else:
+                jobs.append((path, dst, key_path))
+    elif args.command in ('decrypt', 'verify'):
+        # Outputs are named by dropping the suffix, so anything else would be decrypted onto itself.
+        rejected = [path for path, _ in files if not path.endswith(CONTAINER_SUFFIX)]
+        files = [(path, relative) for path, relative in files if path.endswith(CONTAINER_SUFFIX)]
+        options.update(chunk_size=args.chunk_size)
+        if args.command == 'verify':
+            worker = _verify_job
+            jobs = [(path, _stem(path) + KEY_SUFFIX) for path, _ in files]
+        else:
+            worker = _decrypt_job
+            for path, relative in files:
+                dst = _destination(_stem(path), _stem(relative), args.output_dir)
+                if not args.force and os.path.exists(dst):
+                    skipped.append(dst)
+                else:
+                    jobs.append((path, dst, _stem(path) + KEY_SUFFIX, args.keep_key))
+    else:
+        options.update(integrity=args.integrity, compression=args.compression,
+                       compression_level=args.compression_level, seekable=args.seekable)
+        worker = _bench_job
+        jobs = [(path, args.binary) for path, _ in files]
+    if worker in (_encrypt_job, _decrypt_job):
+        # Two inputs mapped to one output would overwrite each other, possibly from two workers at once.
+        outputs = Counter(output for job in jobs for output in (job[1:3] if worker is _encrypt_job else job[1:2]))
+        clashes = sorted(output for output, uses in outputs.items() if uses > 1)
+        if clashes:
+            parser.error(f'several inputs would be written to {", ".join(clashes)}')
+    for path in rejected:
+        print(f'{path}: not a {CONTAINER_SUFFIX} container, skipped', file=sys.stderr)
+    for path in skipped:
+        print(f'{path}: exists, skipped (use --force to overwrite)', file=sys.stderr)
+
+    report = run(partial(worker, usr_key, options), jobs, args.jobs)
+    print(_summary(args.command, report))
+    return 1 if report['failed'] or skipped or rejected else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
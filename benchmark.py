@@ -0,0 +1,345 @@
+"""
+Benchmark suite for the BARS models.
+
+Runs Model_V1_0_0, Model_V1_5_0 and Model_V2_0_0 over a deterministic generated corpus (ASCII, Latin-1, CJK heavy and
+emoji heavy text, 1 KB to 100 MB) and writes machine readable JSON: encrypt/decrypt throughput in MB/s, peak memory,
+ciphertext expansion and key size per model, corpus and size. Every case runs in its own process and working directory,
+so the key files the models write never collide and peak memory is measured per case.
+Model_V2_0_0 runs as 2.00 (unknown characters extend the alphabet), 2.00-numpy and 2.00-tag (unknown characters
+are tagged and the tags reverted, which is the slow path for the CJK and emoji corpora).
+
+    python benchmark.py run --sizes 1KB 10KB 100KB --output before.json
+    python benchmark.py compare before.json after.json
+    python benchmark.py codecs --files 1.txt 2.txt 3.txt
+
+compare flags throughput regressions between two runs and superlinear scaling within the second run, and exits with
+status 1 when anything is flagged. codecs reports the size/time trade-off of each compression codec of Model_V2_0_0
+(container and key size, compression and decompression time) on the sample files or the generated corpus.
+
+Code written and modified by : Arnab Pramanik
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import math
+import os
+import platform
+import random as rd
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+
+# model name: (module, attribute holding the result, extra BARS arguments)
+MODELS = {
+    '1.00': ('Model_V1_0_0', 'return_cypher', {}),
+    '1.50': ('Model_V1_5_0', 'return_cypher', {}),
+    '2.00': ('Model_V2_0_0', 'get', {'progress': False}),
+    '2.00-numpy': ('Model_V2_0_0', 'get', {'progress': False, 'backend': 'numpy'}),
+    '2.00-tag': ('Model_V2_0_0', 'get', {'progress': False, 'unknown_chars': 'tag'}),
+}
+KEY_FILES = ('Seq.key', 'BARS.key')
+# codec, level of Model_V2_0_0 compression settings compared by the codecs command
+CODECS = (('none', None), ('zlib', 1), ('zlib', 6), ('zlib', 9), ('bz2', 1), ('bz2', 9), ('lzma', 0), ('lzma', 6))
+CORPORA = ('ascii', 'latin1', 'cjk', 'emoji')
+UNITS = {'KB': 1 << 10, 'MB': 1 << 20, 'GB': 1 << 30}
+USR_KEY = 'NT))(!&#AR'
+
+
+# =============================== Corpus ==========================================
+
+
+def parse_size(size):
+    for unit, factor in UNITS.items():
+        if size.upper().endswith(unit):
+            return int(float(size[:-len(unit)]) * factor)
+    return int(size)
+
+
+def _vocabulary(kind, rng):
+    ascii_letters = 'abcdefghijklmnopqrstuvwxyz'
+    if kind == 'ascii':
+        pool, lengths = ascii_letters + 'ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789', (2, 9)
+    elif kind == 'latin1':
+        pool, lengths = ascii_letters + ''.join(map(chr, range(0xC0, 0x100))), (2, 9)
+    elif kind == 'cjk':
+        pool, lengths = ''.join(map(chr, range(0x4E00, 0x4E00 + 3000))), (1, 4)
+    elif kind == 'emoji':
+        pool, lengths = ascii_letters + ''.join(map(chr, range(0x1F300, 0x1F650))), (1, 6)
+    else:
+        raise ValueError(f'Unknown corpus {kind!r}, expected one of {CORPORA}')
+    return [''.join(rng.choices(pool, k=rng.randint(*lengths))) for _ in range(4000)]
+
+
+def generate_corpus(kind, size, seed=0):
+    """
+    Returns text of the given kind whose UTF-8 encoding is size bytes long (or a few bytes less). The same kind, size
+    and seed always give the same text.
+    """
+    rng = rd.Random(f'{kind}:{seed}')
+    words = _vocabulary(kind, rng)
+    separators = [' '] * 12 + [', ', '. ', '\n']
+    parts = []
+    total = 0
+    while total < size:
+        batch = rng.choices(words, k=4096)
+        ends = rng.choices(separators, k=4096)
+        piece = ''.join(word + end for word, end in zip(batch, ends))
+        parts.append(piece)
+        total += len(piece.encode('utf-8'))
+    text = ''.join(parts).encode('utf-8')[:size]
+    return text.decode('utf-8', errors='ignore')
+
+
+# =============================== Runner ==========================================
+
+
+def _ciphertext_size(ciphertext):
+    return len(ciphertext.encode('utf-8')) if isinstance(ciphertext, str) else len(ciphertext)
+
+
+def _key_size():
+    return sum(os.path.getsize(name) for name in KEY_FILES if os.path.exists(name))
+
+
+def _round_trip(module, attribute, options, text):
+    # Returns the ciphertext, key size, decrypted text and the encrypt and decrypt times of one round trip.
+    start = time.perf_counter()
+    ciphertext = getattr(module.BARS(USR_KEY, text, True, False, **options), attribute)
+    encrypt_s = time.perf_counter() - start
+    key_bytes = _key_size()
+    start = time.perf_counter()
+    decrypted = getattr(module.BARS(USR_KEY, ciphertext, False, False, **options), attribute)
+    decrypt_s = time.perf_counter() - start
+    for name in KEY_FILES:
+        if os.path.exists(name):
+            os.remove(name)
+    return ciphertext, key_bytes, decrypted, encrypt_s, decrypt_s
+
+
+def _run_case(model, kind, size, seed, repeat):
+    # Runs in a fresh worker process: imports the model there and works inside a temporary directory.
+    module_name, attribute, options = MODELS[model]
+    text = generate_corpus(kind, size, seed)
+    input_bytes = len(text.encode('utf-8'))
+    result = {'model': model, 'corpus': kind, 'size': size, 'input_bytes': input_bytes, 'chars': len(text)}
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as work_dir, contextlib.redirect_stderr(io.StringIO()):
+        sys.path.insert(0, cwd)
+        os.chdir(work_dir)
+        try:
+            module = __import__(module_name)
+            # One untimed round trip, so lazily imported dependencies are not charged to the first case.
+            warm_up = getattr(module.BARS(USR_KEY, 'warm up', True, False, **options), attribute)
+            getattr(module.BARS(USR_KEY, warm_up, False, False, **options), attribute)
+            encrypt_times, decrypt_times = [], []
+            for _ in range(repeat):
+                ciphertext, key_bytes, decrypted, encrypt_s, decrypt_s = _round_trip(module, attribute, options, text)
+                encrypt_times.append(encrypt_s)
+                decrypt_times.append(decrypt_s)
+            # Peak memory comes from one more, untimed round trip under tracemalloc, which slows the work down. It
+            # counts what the round trip allocates on top of the input text, and not the building of the corpus.
+            del ciphertext, decrypted
+            tracemalloc.start()
+            try:
+                ciphertext, _, decrypted, _, _ = _round_trip(module, attribute, options, text)
+                _, peak_memory = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+        except Exception as e:
+            result['error'] = f'{type(e).__name__}: {e}'
+            return result
+        finally:
+            os.chdir(cwd)
+    encrypt_s, decrypt_s = min(encrypt_times), min(decrypt_times)
+    result.update({
+        'ok': decrypted == text,
+        'encrypt_s': encrypt_s,
+        'decrypt_s': decrypt_s,
+        'encrypt_mbps': input_bytes / (1 << 20) / encrypt_s if encrypt_s else None,
+        'decrypt_mbps': input_bytes / (1 << 20) / decrypt_s if decrypt_s else None,
+        'peak_memory_bytes': peak_memory,
+        'ciphertext_bytes': _ciphertext_size(ciphertext),
+        'expansion_ratio': _ciphertext_size(ciphertext) / input_bytes if input_bytes else None,
+        'key_bytes': key_bytes,
+    })
+    return result
+
+
+def run(models, corpora, sizes, seed=0, repeat=1, log=sys.stderr):
+    results = []
+    for model in models:
+        for kind in corpora:
+            for size in sizes:
+                # One process per case, so peak memory and imports are not shared between cases.
+                with ProcessPoolExecutor(max_workers=1) as executor:
+                    result = executor.submit(_run_case, model, kind, size, seed, repeat).result()
+                results.append(result)
+                if 'error' in result:
+                    print(f'{model:>10} {kind:>6} {size:>10} B  {result["error"]}', file=log)
+                else:
+                    print(f'{model:>10} {kind:>6} {size:>10} B  encrypt {result["encrypt_mbps"]:8.3f} MB/s  '
+                          f'decrypt {result["decrypt_mbps"]:8.3f} MB/s  x{result["expansion_ratio"]:.2f}  '
+                          f'{"ok" if result["ok"] else "MISMATCH"}', file=log)
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'seed': seed,
+        'repeat': repeat,
+        'results': results,
+    }
+
+
+def _run_codecs(name, text, codecs):
+    # Runs in a fresh worker process; encryption and decryption stay in memory, so no working directory is needed.
+    sys.path.insert(0, os.getcwd())
+    import Model_V2_0_0 as model
+    input_bytes = len(text.encode('utf-8'))
+    results = []
+    for codec, level in codecs:
+        encrypt_stats, decrypt_stats = model.BARSStats(), model.BARSStats()
+        ciphertext, key = model.encrypt(USR_KEY, text, stats=encrypt_stats, compression=codec, compression_level=level)
+        decrypted = model.decrypt(USR_KEY, ciphertext, key, stats=decrypt_stats)
+        results.append({
+            'codec': codec,
+            'level': level,
+            'corpus': name,
+            'input_bytes': input_bytes,
+            'ok': decrypted == text,
+            'ciphertext_bytes': len(ciphertext),
+            'key_bytes': len(key),
+            'expansion_ratio': len(ciphertext) / input_bytes if input_bytes else None,
+            # compression covers the container; key covers building (and compressing) or parsing the key
+            'compress_s': encrypt_stats.phases['compression']['wall'],
+            'decompress_s': decrypt_stats.phases['compression']['wall'],
+            'key_s': encrypt_stats.phases['key']['wall'] + decrypt_stats.phases['key']['wall'],
+            'encrypt_s': encrypt_stats.wall,
+            'decrypt_s': decrypt_stats.wall,
+        })
+    return results
+
+
+def run_codecs(texts, codecs=CODECS, log=sys.stderr):
+    """
+    Encrypts and decrypts every (name, text) pair once per (codec, level) in codecs and returns the report.
+    """
+    results = []
+    for name, text in texts:
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            rows = executor.submit(_run_codecs, name, text, codecs).result()
+        results.extend(rows)
+        for row in rows:
+            level = '' if row['level'] is None else row['level']
+            print(f'{name:>16} {row["codec"]:>5}{level!s:>2}  {row["ciphertext_bytes"]:>10} B  '
+                  f'x{row["expansion_ratio"]:.2f}  key {row["key_bytes"]:>6} B  compress {row["compress_s"]:8.4f} s  '
+                  f'decompress {row["decompress_s"]:8.4f} s  {"ok" if row["ok"] else "MISMATCH"}', file=log)
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': results,
+    }
+
+
+# =============================== Compare ==========================================
+
+
+def _cases(report):
+    return {(r['model'], r['corpus'], r['size']): r for r in report['results'] if 'error' not in r}
+
+
+def compare(before, after, threshold=0.10, max_exponent=1.2, min_seconds=0.01):
+    """
+    Returns a list of human readable findings: cases whose encrypt or decrypt throughput dropped by more than
+    threshold from before to after, cases that stopped round tripping, and, within after, pairs of consecutive sizes
+    whose time grows faster than size ** max_exponent (only where the smaller case takes at least min_seconds).
+    """
+    findings = []
+    old_cases, new_cases = _cases(before), _cases(after)
+    for case, new in sorted(new_cases.items()):
+        if not new['ok']:
+            findings.append(f'{case}: decrypted text does not match the input')
+        old = old_cases.get(case)
+        if old is None:
+            continue
+        for metric in ('encrypt_mbps', 'decrypt_mbps'):
+            if old[metric] and new[metric] < old[metric] * (1 - threshold):
+                findings.append(f'{case}: {metric} regressed {old[metric]:.3f} -> {new[metric]:.3f} MB/s '
+                                f'({new[metric] / old[metric] - 1:+.0%})')
+
+    series = {}
+    for (model, kind, size), result in new_cases.items():
+        series.setdefault((model, kind), []).append(result)
+    for (model, kind), results in sorted(series.items()):
+        results.sort(key=lambda r: r['input_bytes'])
+        for small, large in zip(results, results[1:]):
+            for metric in ('encrypt_s', 'decrypt_s'):
+                if small[metric] < min_seconds or large['input_bytes'] <= small['input_bytes']:
+                    continue
+                exponent = (math.log(large[metric] / small[metric]) /
+                            math.log(large['input_bytes'] / small['input_bytes']))
+                if exponent > max_exponent:
+                    findings.append(f'({model!r}, {kind!r}): {metric} scales as n^{exponent:.2f} between '
+                                    f'{small["size"]} and {large["size"]} bytes')
+    return findings
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the BARS models.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    run_parser = commands.add_parser('run', help='run the benchmark and write JSON')
+    run_parser.add_argument('--models', nargs='+', default=list(MODELS), choices=list(MODELS))
+    run_parser.add_argument('--corpora', nargs='+', default=list(CORPORA), choices=CORPORA)
+    run_parser.add_argument('--sizes', nargs='+', default=['1KB', '10KB', '100KB'],
+                            help='input sizes such as 1KB, 10MB or 100MB')
+    run_parser.add_argument('--seed', type=int, default=0)
+    run_parser.add_argument('--repeat', type=int, default=1, help='runs per case; the fastest is reported')
+    run_parser.add_argument('--output', help='JSON file to write (default: standard output)')
+    compare_parser = commands.add_parser('compare', help='compare two JSON reports')
+    compare_parser.add_argument('before')
+    compare_parser.add_argument('after')
+    compare_parser.add_argument('--threshold', type=float, default=0.10,
+                                help='relative throughput drop that counts as a regression')
+    compare_parser.add_argument('--max-exponent', type=float, default=1.2,
+                                help='largest acceptable growth exponent of time with input size')
+    codecs_parser = commands.add_parser('codecs', help='compare the compression codecs of Model_V2_0_0')
+    codecs_parser.add_argument('--files', nargs='+', help='sample text files (default: the generated corpus)')
+    codecs_parser.add_argument('--corpora', nargs='+', default=list(CORPORA), choices=CORPORA)
+    codecs_parser.add_argument('--sizes', nargs='+', default=['100KB'])
+    codecs_parser.add_argument('--seed', type=int, default=0)
+    codecs_parser.add_argument('--output', help='JSON file to write (default: standard output)')
+    args = parser.parse_args(argv)
+
+    if args.command in ('run', 'codecs'):
+        if args.command == 'run':
+            report = run(args.models, args.corpora, [parse_size(size) for size in args.sizes], args.seed, args.repeat)
+        elif args.files:
+            texts = []
+            for name in args.files:
+                with open(name, encoding='utf-8') as sample:
+                    texts.append((os.path.basename(name), sample.read()))
+            report = run_codecs(texts)
+        else:
+            report = run_codecs((f'{kind}-{size}', generate_corpus(kind, parse_size(size), args.seed))
+                                for kind in args.corpora for size in args.sizes)
+        dumped = json.dumps(report, indent=2)
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as output:
+                output.write(dumped)
+        else:
+            print(dumped)
+        return 0
+
+    with open(args.before, encoding='utf-8') as before, open(args.after, encoding='utf-8') as after:
+        findings = compare(json.load(before), json.load(after), args.threshold, args.max_exponent)
+    for finding in findings:
+        print(finding)
+    if not findings:
+        print('No regressions or superlinear scaling found.')
+    return 1 if findings else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
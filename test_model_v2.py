@@ -0,0 +1,146 @@
+"""
+Regression tests for Model_V2_0_0: the import-time budget, round trips over every backend, integrity mode, codec and
+input type, and decryption of archives written by earlier releases.
+
+    python -m pytest -q test_model_v2.py
+
+Cases that need NumPy are skipped when it is not installed.
+"""
+
+import base64
+import io
+import os
+import random
+import subprocess
+import sys
+
+import pytest
+
+import Model_V2_0_0 as model
+
+USR_KEY = 'NT))(!&#AR'
+IMPORT_BUDGET_S = 0.1  # measured at about 16 ms; numpy and tqdm must not be imported with the module
+BACKENDS = ('python', 'numpy')
+INTEGRITIES = ('mac', 'sum')
+CODECS = ('zlib', 'none', 'bz2', 'lzma')
+
+_rng = random.Random(0)
+# '\udc80' is a lone surrogate, as os.fsdecode() gives for undecodable file names.
+TEXT = ''.join(_rng.choice('abcdefghij klmnop\nQRS.,✓é漢字😀\udc80') for _ in range(20000))
+DATA = _rng.randbytes(20000)
+
+# Written by Model 2.00 as released (before the .bar container): encrypt USR_KEY, BASELINE_TEXT, with its BARS.key.
+BASELINE_TEXT = 'Hello, BARS! ✓ café'
+BASELINE_CIPHERTEXT = base64.b64decode(
+    b'eJyFVIkRgzAMW4UR5P2X60GsJxRMe9dQYsu2pKQKKNT5Qa0n6EfPOHevSKwHaGetfLy+Rz2AXjFMWOmA/q7Q6qCO7hdrcwDtzpgryL1EVFKR'
+    b'GZQz9egrDlC4wPaC8/icDUL6Z2jNzhc1dEodUih2bWIln3Iwjo9dLQstXbhhUkjbAAoO7iXVc7AqqvNHUBsm+hJ2MGDJiuVmUEtviaJdRN/h'
+    b'pg9OgzYCC8onLayvjHf1g1vyRTSbcjNs54xCye+gWXgm7ASbPtgYQONGsWlDZ3pAfYckb0LxjcTZShC1cgYtr5xuKb5ZFMuRTbjpmC3lWVVF'
+    b'Jo2zHP4d1Ida8TmwuqbcpcT7V6dkLkTf5o8poL4n9W8CtPT2mBfYfMqefBrauhNp4pMfbh1BfS+JPwkexIZV0q6DUJEdIpNq9ZYsf5397qyi'
+    b'wbp1t2uEEkWzUPK2jiQI6VHsEt4Hxw8d55FP')
+BASELINE_KEY = base64.b64decode(
+    b'eJyN2luSG7kOBNAVdYQIkKC0/41Ny/LEuE/eOzEfsqPYVXzgkUgA7P7az6+ur7Xr/V/fr9vn18BhoPrn81wGVm8G7uvnwH5c3niySA8Dtw7b'
+    b'WHzxGObcLwdiVT7ZHr6frDKHOfbrwYA7783OZ5hjFNhdscq3AJbHYfdHIU68sdjsKyTiwEsRKXbPf4bjdiuhRwjESd1Gv7TKR5jUwzeUskKd'
+    b'1S6rjfV4FpddDrw1pfaYpTzNLASgYXYYBFs/68nAVXGjopzzbN4ot+XBTrjH0ynUQreabI/y9Ate2IdVb/nJKPERowq9VfigBnW047P4ZL8Y'
+    b'GDGpKryFrdcjdqoTi7dC0nnpTppxCUkqekTbceMlmNbVAVM8X0LyRHDRSkd59AuJ3WKdo9TPjjfU/oN9bH1hXkjkurEAD5FRf1viz3qyz17q'
+    b'6agXEXwL2HPFY87eoWp2URpDC/EGtD1O8eSodTSOp9tyXzt856UjxNH44sYUCifQKuL/yzXVqvi1DBGlzs4jTJpl93UV39DYWpfegsAyDDtD'
+    b'6ZvGsTZuH+NWaY0lO1rGqdGPWt/ssEc3FoxLQxjPtl5BFjXhFeJgUm28DdLhFWLK1nZGsn10tWPsG41pC7rHs06wCXUSJG9FUBIC9KwVBF6S'
+    b'd64wjcTHYDny9QQm9nmNDX3U2pVdhEBlPftoXlKWdY0vnnWL7O3pb8SogB4NbKcLB7C4dfdR0o2RanYMRKKl0AX72oKmZ6vxE7WS5FQzjyCk'
+    b'3XcoUt/Zwa1MqZYiLn24IsxHSi00H+UzivgKcW2UGRFtwmf1ry2wjtT7aGEjsd6hWjUpsG6JUqu4q0EpjY6TvLKCoAuWqixD0VLI1c4ZPurp'
+    b'FVhrDaWJHZOXGzYXapG33PBRY88KE9PDSocKyDL8TyS6wdCCHD1d1TSiJe8j7FkHWYLc1l52+EbwKxUdubHJ34qgqS2Mqd16CM9a4EhtStUr'
+    b'HMNZZwqqx173KWFoLfKogmVYHQsBO3zJhDsyAsG4lF+bkx0HRv5psrNMTI7Fy3lYKVAlYoBFkWPciTKK9YurYSxBcxzQj46Zdavm8mArql1u'
+    b'Yxw45rRRUDQl0wWC4wnToQ/TQCOQwlx6qlF/i54rvF+CN4E5QRINDSuqVhqSGlvNFCcYcsSO2GjUggK0gyNqWifyK+sUbZpSWaSJaghzbD/Z'
+    b'piXbyteVSC3BbsmK2gy1NZ8VaogCiXStovgailNgTsmfdWYZ0URsFhsNxR3JQkTesEedd0fHQQu9SrPF14pabWQLWoombAjcUZeIYB1EX5ax'
+    b'UsIsokCP+dly1cgdBKIO+qgsrvh6ArwioTV/PUpcx9MTJyFXWQhlUcSXgpX4eESZjppXGIaeuRPtWCRrIaxaYspKkBHbpEc7OIQMoP1EcbEH'
+    b'6xqlGezouqU4PXr4u26zjIMVyZ24dYJUiHRJLqNvG0rUHiOpCgYrInynf9+HmW87jeSpIvBEwSc6GVHwjrJSxLtwqh/W/LGp979/CNtTRl0+'
+    b'Gj/RNpQaqdFtdaciE4qarmH4KP4T/Vxzy0h8oj+ncXa0v7P4bMFD1w4GFjEx+K3oKoydNgpEJA88Nly1vPu40TbOHnOliY2JwGUY/dMnopuu'
+    b'tCv6y1Kt/3lFIe5kMGvEDTd57LeUbL8d2AJdNPGjt6eKPOwY8E7kPZ5kBQQp4xOXL0KkAt+Rmhsig1BkhSGKOpjWztZvdHptV8l/O0sKEmJT'
+    b'yyU52pm6B/WRHCmvjmJ23E8IZq4IS+J3gn5G38c5leCkBCPpUGDC8IqoGE1ts8NjqXH0hK27XQ0o2mJ+McFhI5/sQDNTfP3RCB32JdW+ppdl'
+    b'UfkaChXONv5GnSEuhEQ7Sla2o+WvB5cUtgJDtaYVaZn4lRed4rKUSgvbiVaAiDdGnBt6NhsP5qe7RgqgwS4xoCQjHeIyppeY2OLZtv4zedvM'
+    b'm3VuI4iWJLbyckz4mosaMII6R5YlL+1gmdHv0zYmOhbG/YlaY1ymkpwdRVwRISTdOvARiEU7ycU2nYlLKeFZWmirxY4mtiX8uEESN1kNhRP1'
+    b'SP13dIOOcrsY2+a1FVcLFMeyIOQ2IpXLW4n6nuIKVMkbqcKMedEJgq3It8WdHeE27hZFw9Uy/40+ZhSEPGxHaAzXMv+INNLUaiflixZHXLWK'
+    b'UmBkluJd3NKJLCdu/kSWEz2NsEgPGyWL6AUGA9Y6bhQLpN2d1xU047wFHtfC2PqNJC9qKXGVL5LiAM0oPBuD815F4JVsNtrk0QyJbCnu0rLP'
+    b'cg5z9zKfqrhXoNqWHFpq0EFVP4nhO/x/xj7CeXPHb32+m5zvO53vazbfj7+bHv+83GTM8/Pxx1/fc/3nx/dF4///GC/3v25j/+vLj7+vp/8Y'
+    b'PZ7kH6m9V/8I5vFrrc9v//6dX33J99jnnfX7d//8/D3091bff/p8Wr9/n+fefwGwgtpK')
+
+
+@pytest.fixture(params=BACKENDS)
+def backend(request):
+    if request.param == 'numpy':
+        pytest.importorskip('numpy')
+    return request.param
+
+
+@pytest.fixture(autouse=True)
+def work_dir(tmp_path, monkeypatch):
+    # Key files written by BARS and the earlier releases stay out of the repository.
+    monkeypatch.chdir(tmp_path)
+
+
+def test_import_time_budget():
+    here = os.path.dirname(os.path.abspath(__file__))
+    command = [sys.executable, '-X', 'importtime', '-c', 'import Model_V2_0_0']
+    subprocess.run(command, cwd=here, capture_output=True, check=True)  # compiles the bytecode
+    report = subprocess.run(command, cwd=here, capture_output=True, text=True, check=True).stderr
+    # Lines are 'import time: self [us] | cumulative | imported package'.
+    imported = {}
+    for line in report.splitlines()[1:]:
+        _, cumulative, name = line.split('|')
+        imported[name.strip()] = int(cumulative)
+    assert imported['Model_V2_0_0'] / 1e6 < IMPORT_BUDGET_S
+    assert 'numpy' not in imported and 'tqdm' not in imported
+
+
+@pytest.mark.parametrize('integrity', INTEGRITIES)
+@pytest.mark.parametrize('codec', CODECS)
+@pytest.mark.parametrize('plain', (TEXT, DATA), ids=('text', 'bytes'))
+def test_round_trip(backend, integrity, codec, plain):
+    ciphertext, key = model.encrypt(USR_KEY, plain, backend=backend, integrity=integrity, compression=codec)
+    assert model.detect_version(key) == 'bar'
+    for decrypt_backend in BACKENDS if backend == 'numpy' else ('python',):
+        assert model.decrypt(USR_KEY, ciphertext, key, backend=decrypt_backend) == plain
+
+    tampered = bytearray(ciphertext)
+    tampered[len(tampered) // 2] ^= 1
+    with pytest.raises((model.IntegrityViolation, model.DecryptionError)):
+        model.decrypt(USR_KEY, bytes(tampered), key, backend=backend)
+
+
+@pytest.mark.parametrize('integrity', INTEGRITIES)
+@pytest.mark.parametrize('seekable', (False, True))
+@pytest.mark.parametrize('plain', (TEXT, DATA), ids=('text', 'bytes'))
+def test_stream_round_trip(backend, integrity, seekable, plain):
+    key_file = io.BytesIO()
+    chunks = [plain[start:start + 3000] for start in range(0, len(plain), 3000)]
+    container = b''.join(model.encrypt_stream(USR_KEY, chunks, backend=backend, integrity=integrity,
+                                              key_file=key_file, seekable=seekable))
+    key = key_file.getvalue()
+    blocks = [container[start:start + 1000] for start in range(0, len(container), 1000)]
+    decrypted = list(model.decrypt_stream(USR_KEY, blocks, backend=backend, key_data=key))
+    assert plain[:0].join(decrypted) == plain
+    assert model.decrypt(USR_KEY, container, key, backend=backend) == plain
+    if seekable:
+        assert model.decrypt_range(USR_KEY, container, 12345, 678, key_data=key) == plain[12345:13023]
+
+
+def test_baseline_key():
+    assert model.detect_version(BASELINE_KEY) == '2.0'
+    assert model.decrypt(USR_KEY, BASELINE_CIPHERTEXT, BASELINE_KEY) == BASELINE_TEXT
+    # The sums of that release do not depend on the user key, so a wrong one fails while decoding the tokens.
+    with pytest.raises((model.IntegrityViolation, model.DecryptionError)):
+        model.decrypt('another key', BASELINE_CIPHERTEXT, BASELINE_KEY)
+
+
+@pytest.mark.parametrize('release, text, version', (
+    ('Model_V1_0_0', TEXT[:300].encode('ascii', 'ignore').decode(), '1.0'),
+    ('Model_V1_5_0', TEXT[:300], '1.5'),
+))
+def test_release_keys(release, text, version):
+    # Model 1.00/1.50 write their key to Seq.key and return the bit string.
+    module = pytest.importorskip(release)
+    ciphertext = module.BARS(USR_KEY, text, True, False).return_cypher
+    with open('Seq.key', 'rb') as key_file:
+        key = key_file.read()
+    assert model.detect_version(key) == version
+    assert model.decrypt(USR_KEY, ciphertext, key) == text
+    migrated = model.migrate(USR_KEY, [(ciphertext, key)])
+    assert model.decrypt(USR_KEY, *migrated[0]) == text